@@ -0,0 +1,186 @@
+import argparse
+import time
+import signal
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from extract import fetch_zip
+from main_script import load_config, process_file
+
+
+# Expand a list of seasons and season ranges (e.g. '1011-1314,2425') into season codes
+def parse_seasons(seasons):
+    season_list = []
+    for item in seasons.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        if '-' in item:
+            first, last = item.split('-')
+            # A season code is the last two digits of both years, e.g. '1011' for 2010-2011
+            first_year, last_year = int(first[:2]), int(last[:2])
+            if last_year < first_year:
+                last_year += 100  # Range across the turn of the century, e.g. '9900-0102'
+            for start_year in range(first_year, last_year + 1):
+                season_list.append(f"{start_year % 100:02d}{(start_year + 1) % 100:02d}")
+        else:
+            season_list.append(item)
+
+    # Remove duplicates while keeping the order
+    return list(dict.fromkeys(season_list))
+
+
+# Expand a comma separated list of league files (e.g. 'I1,I2,E0')
+def parse_leagues(leagues):
+    return list(dict.fromkeys(league.strip() for league in leagues.split(',') if league.strip()))
+
+
+# Raise a TimeoutError in the worker when a task runs longer than its timeout
+def _raise_timeout(signum, frame):
+    raise TimeoutError("Task timed out")
+
+
+def _run_with_timeout(timeout, function, *args):
+    # SIGALRM is only available on Unix, elsewhere tasks run without a timeout
+    if not timeout or not hasattr(signal, 'SIGALRM'):
+        return function(*args)
+
+    previous_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.alarm(int(timeout))
+    try:
+        return function(*args)
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+# Download task: fetch the ZIP of one season into the download cache
+def download_season(season_year, config, offline=False, timeout=None):
+    start_time = time.perf_counter()
+    url = config["base_url"].format(season_year=season_year)
+    result = {'season': season_year, 'url': url, 'status': 'ok', 'bytes': 0, 'error': None}
+    try:
+        _, _, result['bytes'] = _run_with_timeout(
+            timeout, fetch_zip, url, config.get("cache_folder"), offline, config.get("cache_max_age", 0)
+        )
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+
+# Pipeline task: transform and load one league of one season from the cached ZIP
+def process_league(season_year, league, config, timeout=None):
+    start_time = time.perf_counter()
+    result = {'season': season_year, 'league': league, 'status': 'ok', 'matches': 0, 'error': None}
+    try:
+        # The ZIP was downloaded by the download phase, so the task always reads from the cache.
+        # Chart windows are never shown, saved charts are rendered headless by the task.
+        team_stats = _run_with_timeout(
+            timeout, process_file, season_year, league, None, None, config, True, config.get("charts") == "save"
+        )
+        result['matches'] = int(team_stats['Matches'].sum() // 2)
+        if config.get("charts") == "defer":
+            result['team_stats'] = team_stats
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+        result['traceback'] = traceback.format_exc()
+    result['seconds'] = time.perf_counter() - start_time
+    return result
+
+
+def run_backfill(seasons, leagues, config, workers=4, timeout=None, offline=False):
+    """
+    Run the pipeline for every (season, league) pair across a process pool.
+
+    Every league of a season comes from the same ZIP file, so each season is downloaded
+    once in a first phase; the league tasks then read their CSV from the download cache.
+    With the 'defer' chart mode, the charts of the completed tasks are rendered in a last
+    phase across worker processes. Failures are collected per task instead of stopping the run.
+
+    Returns:
+    - downloads (list): One result dictionary per season.
+    - tasks (list): One result dictionary per (season, league) pair.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Phase 1: download each season ZIP once
+        futures = [executor.submit(download_season, season, config, offline, timeout) for season in seasons]
+        downloads = [future.result() for future in as_completed(futures)]
+        available_seasons = {download['season'] for download in downloads if download['status'] == 'ok'}
+
+        # Phase 2: transform and load every league of the downloaded seasons
+        tasks = []
+        futures = []
+        for season in seasons:
+            for league in leagues:
+                if season in available_seasons:
+                    futures.append(executor.submit(process_league, season, league, config, timeout))
+                else:
+                    tasks.append({'season': season, 'league': league, 'status': 'skipped', 'matches': 0,
+                                  'seconds': 0.0, 'error': 'Season download failed'})
+        tasks.extend(future.result() for future in as_completed(futures))
+
+    # Phase 3: render the deferred charts, a failed chart fails its task instead of the run
+    deferred = [task for task in tasks if 'team_stats' in task]
+    if deferred:
+        from visualization import render_many, chart_path
+
+        chart_folder = config.get("chart_folder", "charts")
+        chart_format = config.get("chart_format", "png")
+        charts = [
+            (task.pop('team_stats'), chart_path(chart_folder, task['season'], task['league'], chart_format),
+             f"{task['league']} {task['season']}")
+            for task in deferred
+        ]
+        try:
+            rendered = render_many(charts, workers, return_errors=True)
+        except Exception as e:
+            rendered = [(None, f"{type(e).__name__}: {e}")] * len(deferred)
+        for task, (_, error) in zip(deferred, rendered):
+            if error:
+                task['status'] = 'failed'
+                task['error'] = f"Chart rendering failed: {error}"
+
+    return downloads, tasks
+
+
+def print_summary(downloads, tasks, elapsed_seconds):
+    downloaded_bytes = sum(download['bytes'] for download in downloads)
+    completed = [task for task in tasks if task['status'] == 'ok']
+    failed = [task for task in tasks if task['status'] != 'ok']
+    matches = sum(task['matches'] for task in completed)
+
+    print("\n=== Backfill Summary ===")
+    print(f"Seasons downloaded: {sum(d['status'] == 'ok' for d in downloads)}/{len(downloads)} ({downloaded_bytes / 1e6:.1f} MB)")
+    print(f"Tasks completed: {len(completed)}/{len(tasks)}")
+    print(f"Elapsed time: {elapsed_seconds:.1f}s")
+    if elapsed_seconds > 0:
+        print(f"Throughput: {len(completed) / elapsed_seconds:.2f} tasks/s, {matches / elapsed_seconds:.0f} matches/s")
+
+    for download in downloads:
+        if download['status'] != 'ok':
+            print(f"FAILED download {download['season']}: {download['error']}")
+    for task in sorted(failed, key=lambda task: (task['season'], task['league'])):
+        print(f"{task['status'].upper()} {task['season']} {task['league']}: {task['error']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline for many seasons and leagues in parallel.")
+    parser.add_argument('--seasons', type=str, required=True, help="Seasons and season ranges (e.g., '1011-1314,2425').")
+    parser.add_argument('--leagues', type=str, required=True, help="League files to process (e.g., 'I1,I2,E0').")
+    parser.add_argument('--workers', type=int, default=4, help="Number of worker processes.")
+    parser.add_argument('--timeout', type=int, default=600, help="Timeout of each task in seconds (0 disables it).")
+    parser.add_argument('--offline', action='store_true', help="Serve the season ZIPs from the download cache without network access.")
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    downloads, tasks = run_backfill(
+        parse_seasons(args.seasons), parse_leagues(args.leagues), load_config(),
+        workers=args.workers, timeout=args.timeout, offline=args.offline
+    )
+    print_summary(downloads, tasks, time.perf_counter() - start_time)
+
+    # Exit with an error code if any task failed
+    if any(task['status'] != 'ok' for task in tasks):
+        exit(1)
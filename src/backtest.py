@@ -0,0 +1,220 @@
+import os
+import glob
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from ingest import read_matches_csv, PIPELINE_COLUMN_SETS
+from transform import calculate_xg, parse_match_dates
+from predict import calculate_match_xg, calculate_match_outcome_probabilities_batch
+
+# Column sets read for a backtest: the pipeline columns plus opening and closing odds
+BACKTEST_COLUMN_SETS = PIPELINE_COLUMN_SETS + ('odds', 'closing_odds')
+
+# Home/draw/away odds columns of each bookmaker, opening and closing
+ODDS_COLUMNS = {
+    'B365': ('B365H', 'B365D', 'B365A'),
+    'B365C': ('B365CH', 'B365CD', 'B365CA'),
+    'PS': ('PSH', 'PSD', 'PSA'),
+    'PSC': ('PSCH', 'PSCD', 'PSCA'),
+    'Avg': ('AvgH', 'AvgD', 'AvgA'),
+    'AvgC': ('AvgCH', 'AvgCD', 'AvgCA'),
+}
+
+# Team totals used by calculate_match_xg
+TEAM_TOTAL_COLUMNS = ['Matches', 'GF', 'GA', 'xG_Scored', 'xG_Conceded']
+
+# Outcome codes of 'FTR' in the order of the probability columns
+OUTCOMES = ['H', 'D', 'A']
+
+
+def prior_team_totals(df, group_columns=()):
+    """
+    Calculate, for every match, the totals of the home and away team over their earlier
+    matches of the same group (e.g. league and season), like the team_stats the pipeline
+    would have built on the day before the match.
+
+    The matches are turned into a long table with one row per team and match, sorted once by
+    team and date, and the totals are exclusive cumulative sums within each team, so the
+    cost grows linearly with the number of matches instead of rebuilding the team stats at
+    every date.
+
+    Returns:
+    - home_totals, away_totals (dict): Arrays of 'Matches', 'GF', 'GA', 'xG_Scored' and
+      'xG_Conceded' per match.
+    """
+    n_matches = len(df)
+    dates = parse_match_dates(df['Date']).to_numpy()
+    if group_columns:
+        groups = df.groupby(list(group_columns), sort=False, observed=True).ngroup().to_numpy()
+    else:
+        groups = np.zeros(n_matches, dtype=int)
+
+    # One row per team and match: the home rows first, then the away rows
+    teams = np.concatenate([df['HomeTeam'].astype(str).to_numpy(), df['AwayTeam'].astype(str).to_numpy()])
+    team_name_codes, team_names = pd.factorize(teams)
+    team_codes = np.tile(groups, 2) * len(team_names) + team_name_codes
+    home_goals = df['FTHG'].to_numpy(dtype=float)
+    away_goals = df['FTAG'].to_numpy(dtype=float)
+    values = pd.DataFrame({
+        'Matches': np.ones(2 * n_matches),
+        'GF': np.concatenate([home_goals, away_goals]),
+        'GA': np.concatenate([away_goals, home_goals]),
+        'xG_Scored': np.concatenate([df['Home_xG_scored'].to_numpy(dtype=float), df['Away_xG_scored'].to_numpy(dtype=float)]),
+        'xG_Conceded': np.concatenate([df['Home_xG_conceded'].to_numpy(dtype=float), df['Away_xG_conceded'].to_numpy(dtype=float)]),
+    })
+
+    # Sort by team, date and file order, and sum everything before each row within its team
+    order = np.lexsort((np.tile(np.arange(n_matches), 2), np.tile(dates, 2), team_codes))
+    sorted_values = values.iloc[order].reset_index(drop=True)
+    prior = sorted_values.groupby(team_codes[order], sort=False).cumsum() - sorted_values
+
+    totals = np.empty((2 * n_matches, len(TEAM_TOTAL_COLUMNS)))
+    totals[order] = prior[TEAM_TOTAL_COLUMNS].to_numpy()
+    home_totals = {column: totals[:n_matches, i] for i, column in enumerate(TEAM_TOTAL_COLUMNS)}
+    away_totals = {column: totals[n_matches:, i] for i, column in enumerate(TEAM_TOTAL_COLUMNS)}
+    return home_totals, away_totals
+
+
+def walk_forward_predictions(df, group_columns=None, min_matches=3, max_goals=6):
+    """
+    Predict every match with the predict.py model, from team totals of earlier matches only.
+
+    Parameters:
+    - df (DataFrame): Matches with results and the xG columns of calculate_xg (odds columns are kept).
+    - group_columns (list): Columns whose groups have separate team totals, by default the
+      'Div' and 'Season' columns that are present (a new season starts from zero).
+    - min_matches (int): Matches a team needs to have played before its fixtures are predicted.
+    - max_goals (int): Number of goals per team covered by the goal matrices.
+
+    Returns:
+    - predictions (DataFrame): The matches with Home_xG, Away_xG, HomeWinProb, DrawProb and
+      AwayWinProb (normalized to sum to 1), and 'Predicted' for the matches that were scored.
+    """
+    df = df.dropna(subset=['FTHG', 'FTAG', 'FTR']).reset_index(drop=True)
+    if group_columns is None:
+        group_columns = [column for column in ['Div', 'Season'] if column in df.columns]
+
+    home_totals, away_totals = prior_team_totals(df, group_columns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        home_xg, away_xg = calculate_match_xg(home_totals, away_totals)
+
+    # Matches of teams with too few earlier matches (or a negative xG) are not predicted
+    predicted = (np.minimum(home_totals['Matches'], away_totals['Matches']) >= min_matches) & (home_xg >= 0) & (away_xg >= 0)
+
+    probabilities = np.full((len(df), 3), np.nan)
+    home_win_prob, draw_prob, away_win_prob, _ = calculate_match_outcome_probabilities_batch(home_xg[predicted], away_xg[predicted], max_goals)
+    outcome_probabilities = np.stack([home_win_prob, draw_prob, away_win_prob], axis=1)
+    probabilities[predicted] = outcome_probabilities / outcome_probabilities.sum(axis=1, keepdims=True)
+
+    predictions = df.copy()
+    predictions['Home_xG'] = np.where(predicted, home_xg, np.nan)
+    predictions['Away_xG'] = np.where(predicted, away_xg, np.nan)
+    predictions['HomeWinProb'] = probabilities[:, 0]
+    predictions['DrawProb'] = probabilities[:, 1]
+    predictions['AwayWinProb'] = probabilities[:, 2]
+    predictions['Predicted'] = predicted
+    return predictions
+
+
+# Function to calculate the log-loss and the (multi-class) Brier score of outcome probabilities
+def score_probabilities(probabilities, outcomes):
+    outcome_matrix = np.eye(3)[outcomes]
+    log_loss = -np.mean(np.log(np.clip(probabilities[np.arange(len(outcomes)), outcomes], 1e-15, None)))
+    brier_score = np.mean(np.sum((probabilities - outcome_matrix) ** 2, axis=1))
+    return log_loss, brier_score
+
+
+def score_predictions(predictions, odds_sets=('B365', 'PSC'), edge=0.05):
+    """
+    Score walk-forward predictions against the results and the bookmaker odds.
+
+    For every odds set with odds in the data, the model is compared with the probabilities
+    implied by the odds (1 / odds, normalized to remove the bookmaker margin) on the same
+    matches, and value bets are simulated: one unit on the outcome with the highest expected
+    value when model probability * odds - 1 exceeds edge.
+
+    Returns:
+    - report (DataFrame): One row for the model on all predicted matches, and one row per
+      odds set with matches, log-loss and Brier score of model and bookmaker, bets, profit and ROI.
+    """
+    predicted = predictions[predictions['Predicted']]
+    probabilities = predicted[['HomeWinProb', 'DrawProb', 'AwayWinProb']].to_numpy()
+    outcomes = predicted['FTR'].astype(str).map({outcome: i for i, outcome in enumerate(OUTCOMES)}).to_numpy()
+
+    log_loss, brier_score = score_probabilities(probabilities, outcomes)
+    rows = [{'Odds': 'model', 'Matches': len(predicted), 'LogLoss': log_loss, 'Brier': brier_score}]
+
+    for name in odds_sets:
+        odds_columns = list(ODDS_COLUMNS[name])
+        if not set(odds_columns).issubset(predicted.columns):
+            continue
+        odds = predicted[odds_columns].to_numpy(dtype=float)
+        valid = np.all(odds > 1, axis=1)
+        if not valid.any():
+            continue
+
+        implied = 1 / odds[valid]
+        implied /= implied.sum(axis=1, keepdims=True)
+        model_log_loss, model_brier = score_probabilities(probabilities[valid], outcomes[valid])
+        book_log_loss, book_brier = score_probabilities(implied, outcomes[valid])
+
+        # Value bets: the outcome with the highest expected value, if it clears the edge
+        expected_values = probabilities[valid] * odds[valid] - 1
+        bet_outcomes = np.argmax(expected_values, axis=1)
+        rows_with_bet = np.flatnonzero(expected_values[np.arange(len(bet_outcomes)), bet_outcomes] > edge)
+        won = bet_outcomes[rows_with_bet] == outcomes[valid][rows_with_bet]
+        profit = np.sum(np.where(won, odds[valid][rows_with_bet, bet_outcomes[rows_with_bet]] - 1, -1.0))
+
+        rows.append({
+            'Odds': name, 'Matches': int(valid.sum()), 'LogLoss': model_log_loss, 'Brier': model_brier,
+            'BookLogLoss': book_log_loss, 'BookBrier': book_brier, 'Bets': len(rows_with_bet),
+            'Profit': profit, 'ROI': profit / len(rows_with_bet) if len(rows_with_bet) else np.nan,
+        })
+
+    return pd.DataFrame(rows)
+
+
+def run_backtest(df, average_xg_per_shot=0.11, average_xg_per_corner=0.02, min_matches=3, max_goals=6,
+                 odds_sets=('B365', 'PSC'), edge=0.05):
+    # Walk-forward backtest of a match DataFrame (raw CSV columns, e.g. from read_matches_csv with BACKTEST_COLUMN_SETS)
+    df = calculate_xg(df.copy(), average_xg_per_shot, average_xg_per_corner)
+    predictions = walk_forward_predictions(df, min_matches=min_matches, max_goals=max_goals)
+    return predictions, score_predictions(predictions, odds_sets, edge)
+
+
+# Function to read league CSV files for a backtest, with the season taken from the folder name (e.g. '24_25/I1.csv')
+def read_backtest_files(paths):
+    frames = []
+    for path in paths:
+        df = read_matches_csv(path, column_sets=BACKTEST_COLUMN_SETS)
+        df['Season'] = os.path.basename(os.path.dirname(os.path.abspath(path)))
+        if 'Div' not in df.columns:
+            df['Div'] = os.path.splitext(os.path.basename(path))[0]
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the match predictions against results and odds.")
+    parser.add_argument('patterns', nargs='+', help="League CSV files or glob patterns (e.g., '*_*/I1.csv').")
+    parser.add_argument('--min-matches', type=int, default=3, help="Matches a team needs before its fixtures are predicted.")
+    parser.add_argument('--odds', type=str, default='B365,PSC', help=f"Odds sets to compare with ({', '.join(ODDS_COLUMNS)}).")
+    parser.add_argument('--edge', type=float, default=0.05, help="Minimum expected value of a value bet.")
+    parser.add_argument('--output', type=str, help="Write the predictions to this CSV file.")
+    args = parser.parse_args()
+
+    paths = sorted({path for pattern in args.patterns for path in glob.glob(pattern)})
+    if not paths:
+        parser.error("No files match the given patterns")
+
+    start_time = time.perf_counter()
+    matches = read_backtest_files(paths)
+    predictions, report = run_backtest(matches, min_matches=args.min_matches, odds_sets=args.odds.split(','), edge=args.edge)
+    elapsed_seconds = time.perf_counter() - start_time
+
+    print(f"=== Backtest ({len(paths)} files, {len(predictions)} matches, {predictions['Predicted'].sum()} predicted, {elapsed_seconds:.1f}s) ===")
+    print(report.to_string(index=False, float_format=lambda value: f"{value:.4f}"))
+    if args.output:
+        predictions.to_csv(args.output, index=False)
+        print(f"Predictions saved to {args.output}")
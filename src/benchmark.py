@@ -0,0 +1,224 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import pandas as pd
+from synthetic import generate_archive
+from ingest import read_matches_csv
+from transform import calculate_xg, calculate_points, calculate_expected_points, aggregate_team_stats, calculate_form
+from predict import predict_match_with_suggestions, predict_fixtures
+from load import save_team_stats_to_parquet, save_team_stats_to_csv, save_matches_to_store
+
+# Default location of the stored baseline, kept under version control next to this script
+# (synthetic archive of the default configuration: 20 teams, 1 season, 1 league, seed 0).
+# Stage times are compared relative to a calibration workload timed on the same machine,
+# so the baseline holds on machines faster or slower than the one that recorded it.
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+
+# Function to time a fixed workload mixing Python loops and small pandas operations, like the
+# pipeline stages do. Its best time measures the speed of the machine running the benchmark.
+def measure_calibration(repeat=3):
+    frame = pd.DataFrame({'Team': [f"Team {i % 20}" for i in range(2000)], 'Goals': [i % 5 for i in range(2000)]})
+
+    def workload():
+        total = 0
+        for value in range(500000):
+            total += value % 7
+        for _ in range(50):
+            frame.groupby('Team')['Goals'].sum().sort_values()
+        return total
+
+    best_seconds = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        workload()
+        seconds = time.perf_counter() - start_time
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+    return best_seconds
+
+
+# Function to time one stage: best wall time over the repeats, peak traced memory and rows/sec
+def measure_stage(function, rows, repeat=3):
+    best_seconds = None
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start_time = time.perf_counter()
+            result = function()
+            seconds = time.perf_counter() - start_time
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+
+    # Peak memory is measured in a separate run, because tracing slows the code down
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        function()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, {
+        'seconds': best_seconds,
+        'peak_memory_mb': peak_memory / 1e6,
+        'rows': rows,
+        'rows_per_second': rows / best_seconds if best_seconds > 0 else None,
+    }
+
+
+def run_benchmark(n_teams=20, n_seasons=1, n_leagues=1, seed=0, repeat=3, stages=None):
+    """
+    Time every pipeline stage separately on a synthetic archive.
+
+    Returns a dictionary with the benchmark configuration, the time of the calibration
+    workload, the measurements of each stage (wall time, peak memory, rows and rows/sec)
+    and checksums of the stage outputs, so a comparison with a baseline catches changed
+    results as well as slowdowns.
+    """
+    archive = generate_archive(n_teams, n_seasons, n_leagues, seed)
+    raw_df = pd.concat(archive.values(), ignore_index=True)
+    n_rows = len(raw_df)
+    measurements = {}
+    checksums = {}
+
+    def run(name, function, rows=n_rows):
+        if stages and name not in stages:
+            return function()
+        result, measurements[name] = measure_stage(function, rows, repeat)
+        return result
+
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, 'archive.csv')
+        raw_df.to_csv(csv_path, index=False)
+
+        # Extract / ingestion
+        df = run('read_matches_csv', lambda: read_matches_csv(csv_path))
+
+        # Transform stages, each one on a copy of the output of the previous stage
+        df = run('calculate_xg', lambda: calculate_xg(df.copy()))
+        points = run('calculate_points', lambda: df.apply(calculate_points, axis=1))
+        df[['HomePoints', 'AwayPoints']] = points
+        df = run('calculate_expected_points', lambda: calculate_expected_points(df.copy()))
+        team_stats = run('aggregate_team_stats', lambda: aggregate_team_stats(df))
+        form_data = run('calculate_form', lambda: calculate_form(df))
+        team_stats = team_stats.merge(form_data, on='Team', how='left')
+
+        # Predict stages: every fixture of the first league and season
+        first_season = archive[next(iter(archive))]
+        fixtures = first_season[['HomeTeam', 'AwayTeam']]
+        run('predict_match_with_suggestions', lambda: [
+            predict_match_with_suggestions(team_stats, home, away) for home, away in fixtures.itertuples(index=False)
+        ], rows=len(fixtures))
+        predictions, _ = run('predict_fixtures', lambda: predict_fixtures(team_stats, fixtures), rows=len(fixtures))
+
+        # Load stages
+        csv_file_path = 'benchmark.csv'
+        run('save_team_stats_to_parquet', lambda: save_team_stats_to_parquet(team_stats, os.path.join(folder, 'parquet'), csv_file_path), rows=len(team_stats))
+        run('save_team_stats_to_csv', lambda: save_team_stats_to_csv(team_stats, os.path.join(folder, 'csv'), csv_file_path), rows=len(team_stats))
+        run('save_matches_to_store', lambda: save_matches_to_store(df, os.path.join(folder, 'store'), 'L1', '2425'))
+
+    checksums['xG'] = float(df['Home_xG_scored'].sum() + df['Away_xG_scored'].sum())
+    checksums['ExpectedPoints_Prob'] = float(df['HomeExpectedPoints_Prob'].sum() + df['AwayExpectedPoints_Prob'].sum())
+    checksums['ExpectedPoints_xG'] = float(df['HomeExpectedPoints_xG'].sum() + df['AwayExpectedPoints_xG'].sum())
+    checksums['Points'] = float(team_stats['Points'].sum())
+    checksums['Form'] = float(team_stats['Form'].sum())
+    checksums['PredictedGoals'] = float(predictions['PredictedHomeGoals'].sum() + predictions['PredictedAwayGoals'].sum())
+
+    return {
+        'config': {'teams': n_teams, 'seasons': n_seasons, 'leagues': n_leagues, 'seed': seed, 'rows': n_rows},
+        'calibration_seconds': measure_calibration(repeat),
+        'stages': measurements,
+        'checksums': checksums,
+    }
+
+
+# Function to compare a benchmark result with a baseline, returns the list of regressions
+def compare_with_baseline(result, baseline, tolerance=0.5, min_seconds=0.01):
+    regressions = []
+
+    if result['config'] != baseline['config']:
+        regressions.append(f"Benchmark configuration differs from the baseline: {result['config']} != {baseline['config']}")
+        return regressions
+
+    for name, expected in baseline['checksums'].items():
+        actual = result['checksums'].get(name)
+        if actual is None or abs(actual - expected) > 1e-6 * max(1.0, abs(expected)):
+            regressions.append(f"Checksum {name} changed: {expected} -> {actual}")
+
+    # Stage times are compared as multiples of the calibration workload, and the baseline
+    # time is scaled to this machine. Stages shorter than min_seconds are too noisy to compare.
+    speed_ratio = result['calibration_seconds'] / baseline['calibration_seconds']
+    for name, expected in baseline['stages'].items():
+        actual = result['stages'].get(name)
+        if actual is None:
+            continue
+        expected_seconds = expected['seconds'] * speed_ratio
+        limit = max(expected_seconds * (1 + tolerance), min_seconds)
+        if actual['seconds'] > limit:
+            regressions.append(f"Stage {name} slowed down: {expected_seconds * 1000:.1f} ms -> {actual['seconds'] * 1000:.1f} ms "
+                               f"(baseline scaled by the calibration ratio {speed_ratio:.2f})")
+
+    return regressions
+
+
+def print_report(result, baseline=None):
+    # Baseline times are shown scaled to the speed of this machine
+    speed_ratio = result['calibration_seconds'] / baseline['calibration_seconds'] if baseline else 1.0
+    print(f"=== Benchmark ({result['config']['rows']} matches) ===")
+    print(f"Calibration: {result['calibration_seconds'] * 1000:.1f} ms (x{speed_ratio:.2f} the baseline machine)")
+    print(f"{'Stage':<32}{'Time (ms)':>12}{'Baseline':>12}{'Peak MB':>10}{'Rows/sec':>14}")
+    for name, stage in result['stages'].items():
+        baseline_stage = (baseline or {}).get('stages', {}).get(name)
+        baseline_text = f"{baseline_stage['seconds'] * speed_ratio * 1000:.1f}" if baseline_stage else '-'
+        rows_per_second = f"{stage['rows_per_second']:.0f}" if stage['rows_per_second'] else '-'
+        print(f"{name:<32}{stage['seconds'] * 1000:>12.1f}{baseline_text:>12}{stage['peak_memory_mb']:>10.1f}{rows_per_second:>14}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every pipeline stage on synthetic data.")
+    parser.add_argument('--teams', type=int, default=20, help="Teams per league.")
+    parser.add_argument('--seasons', type=int, default=1, help="Number of seasons.")
+    parser.add_argument('--leagues', type=int, default=1, help="Number of leagues.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeats per stage (the best time is kept).")
+    parser.add_argument('--stages', type=str, help="Comma separated stages to time (default: all).")
+    parser.add_argument('--output', type=str, help="Write the results as JSON to this file.")
+    parser.add_argument('--baseline', type=str, default=DEFAULT_BASELINE_PATH, help="Baseline JSON file to compare with.")
+    parser.add_argument('--save-baseline', action='store_true', help="Store the results as the new baseline.")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Allowed relative slowdown per stage.")
+    args = parser.parse_args()
+
+    # Without a baseline there is nothing to catch regressions against, so it is an error
+    baseline = None
+    if not args.save_baseline:
+        if not os.path.exists(args.baseline):
+            parser.error(f"Baseline {args.baseline} not found, create it with --save-baseline")
+        with open(args.baseline, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    result = run_benchmark(
+        args.teams, args.seasons, args.leagues, args.seed, args.repeat,
+        stages=args.stages.split(',') if args.stages else None
+    )
+
+    print_report(result, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(result, output_file, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump(result, baseline_file, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+    else:
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print("\n!!! REGRESSIONS AGAINST BASELINE !!!")
+            for regression in regressions:
+                print(f"- {regression}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
@@ -1,41 +1,212 @@
 import os
+import time
+import json
+import hashlib
 import requests
 import zipfile
-import io
+from contextlib import contextmanager, suppress
+
+# Default location of the local download cache
+DEFAULT_CACHE_FOLDER = 'download_cache'
+
+# Size of the chunks written to disk while streaming a download
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Connect and read timeouts of a download in seconds, so a server that stops responding fails the download
+DOWNLOAD_TIMEOUT = (10, 60)
+
+# Name of the marker file recording which archive a folder was extracted from
+EXTRACTED_ARCHIVE_MARKER = '.archive_sha256'
+
+
+# Function to build the paths of the cache entry (metadata) for a URL and of a cached archive
+def _cache_entry_path(cache_folder, url):
+    url_hash = hashlib.sha256(url.encode('utf-8')).hexdigest()
+    return os.path.join(cache_folder, 'index', f"{url_hash}.json")
+
+
+def _cache_blob_path(cache_folder, archive_hash):
+    return os.path.join(cache_folder, 'blobs', f"{archive_hash}.zip")
+
+
+# Function to read the cache entry of a URL, returns None if the URL is not cached
+def _load_cache_entry(cache_folder, url):
+    entry_path = _cache_entry_path(cache_folder, url)
+    if not os.path.exists(entry_path):
+        return None
+
+    with open(entry_path, 'r') as entry_file:
+        entry = json.load(entry_file)
+
+    # Ignore entries whose archive has been removed from the cache
+    if not os.path.exists(_cache_blob_path(cache_folder, entry['sha256'])):
+        return None
+    return entry
+
+
+def _save_cache_entry(cache_folder, url, entry):
+    entry_path = _cache_entry_path(cache_folder, url)
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    with open(entry_path, 'w') as entry_file:
+        json.dump(entry, entry_file, indent=2)
+
+
+# Function to download a ZIP file through the local cache
+def fetch_zip(url, cache_folder=DEFAULT_CACHE_FOLDER, offline=False, max_age=0, timeout=DOWNLOAD_TIMEOUT):
+    """
+    Download a ZIP file into a content-addressed cache keyed by URL.
+
+    Cached archives are revalidated with a conditional GET (ETag / Last-Modified), so an
+    unchanged archive is never downloaded twice. Entries validated less than max_age seconds
+    ago, and every entry in offline mode, are served without any network access.
+
+    Parameters:
+    - url (str): The URL of the ZIP file.
+    - cache_folder (str): The folder of the download cache.
+    - offline (bool): Serve the archive from the cache only.
+    - max_age (int): Number of seconds a validated cache entry is trusted without revalidation.
+    - timeout (tuple): Connect and read timeouts of the request in seconds.
+
+    Returns:
+    - archive_path (str): Path of the cached archive.
+    - archive_hash (str): SHA-256 of the archive content.
+    - downloaded_bytes (int): Number of bytes downloaded (0 when served from the cache).
+    """
+    cache_folder = cache_folder or DEFAULT_CACHE_FOLDER
+    entry = _load_cache_entry(cache_folder, url)
+    entry_path = _cache_entry_path(cache_folder, url)
+
+    if entry and (offline or time.time() - os.path.getmtime(entry_path) < max_age):
+        print(f"Using cached ZIP file for {url}.")
+        return _cache_blob_path(cache_folder, entry['sha256']), entry['sha256'], 0
+
+    if offline:
+        raise FileNotFoundError(f"{url} is not available in the download cache {cache_folder} (offline mode).")
+
+    # Revalidate the cached archive with a conditional GET
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
 
-def download_and_extract_zip(url, folder_name, specific_file=None):
-    # Step 1: Download the ZIP file
     print(f"Downloading data from {url}...")
-    response = requests.get(url)
-    
-    if response.status_code == 200:
+    try:
+        response = requests.get(url, headers=headers, stream=True, timeout=timeout)
+    except requests.RequestException as e:
+        if entry:
+            print(f"Download failed ({e}), using cached ZIP file.")
+            return _cache_blob_path(cache_folder, entry['sha256']), entry['sha256'], 0
+        raise
+
+    # The streamed response is closed on every path, so its connection goes back to the pool
+    with response:
+        if response.status_code == 304 and entry:
+            print("ZIP file not modified, using cached copy.")
+            # Refresh the validation time of the entry
+            os.utime(entry_path)
+            return _cache_blob_path(cache_folder, entry['sha256']), entry['sha256'], 0
+
+        if response.status_code != 200:
+            if entry:
+                print(f"Failed to download ZIP file (status code {response.status_code}), using cached copy.")
+                return _cache_blob_path(cache_folder, entry['sha256']), entry['sha256'], 0
+            raise ConnectionError(f"Failed to download ZIP file. Status code: {response.status_code}")
+
+        # Stream the archive to disk in chunks, hashing it on the way
+        os.makedirs(os.path.join(cache_folder, 'blobs'), exist_ok=True)
+        temporary_path = os.path.join(cache_folder, 'blobs', f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}.{os.getpid()}.part")
+        content_hash = hashlib.sha256()
+        downloaded_bytes = 0
+        try:
+            with open(temporary_path, 'wb') as archive_file:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    archive_file.write(chunk)
+                    content_hash.update(chunk)
+                    downloaded_bytes += len(chunk)
+        except BaseException:
+            # Do not leave a partial download in the cache (the file may not have been created)
+            with suppress(FileNotFoundError):
+                os.remove(temporary_path)
+            raise
         print("ZIP file downloaded successfully.")
-        
-        # Create the folder if it doesn't exist
-        os.makedirs(folder_name, exist_ok=True)
-        
-        # Step 2: Extract the ZIP file content to the folder
-        with zipfile.ZipFile(io.BytesIO(response.content)) as zip_ref:
+
+    # Store the archive under its content hash, unless the same content is already cached
+    archive_hash = content_hash.hexdigest()
+    archive_path = _cache_blob_path(cache_folder, archive_hash)
+    if os.path.exists(archive_path):
+        os.remove(temporary_path)
+    else:
+        os.replace(temporary_path, archive_path)
+
+    _save_cache_entry(cache_folder, url, {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'sha256': archive_hash,
+    })
+
+    return archive_path, archive_hash, downloaded_bytes
+
+
+# Function to open a single member of a ZIP archive without extracting it to disk
+@contextmanager
+def open_zip_member(archive_path, member_name):
+    """
+    Open one member (e.g. 'I1.csv') of a downloaded archive as a binary file object.
+    The member is decompressed while it is read, so it can be passed straight to a
+    parser such as pandas.read_csv without writing an intermediate file.
+    """
+    with zipfile.ZipFile(archive_path) as zip_ref:
+        try:
+            member_file = zip_ref.open(member_name.replace("\\", "/"))
+        except KeyError:
+            raise FileNotFoundError(f"{member_name} not found in {archive_path}.")
+        with member_file:
+            yield member_file
+
+
+def download_and_extract_zip(url, folder_name, specific_file=None, cache_folder=DEFAULT_CACHE_FOLDER, offline=False, max_age=0):
+    # Step 1: Download the ZIP file (or reuse the cached copy)
+    try:
+        archive_path, archive_hash, _ = fetch_zip(url, cache_folder, offline, max_age)
+    except (requests.RequestException, ConnectionError, FileNotFoundError) as e:
+        # Raised to the caller, so a failed download fails one task instead of ending the process
+        print(f"Failed to download ZIP file: {e}")
+        raise
+
+    # Create the folder if it doesn't exist
+    os.makedirs(folder_name, exist_ok=True)
+
+    # Step 2: Extract the ZIP file content to the folder, unless it was already extracted from the same archive
+    marker_path = os.path.join(folder_name, EXTRACTED_ARCHIVE_MARKER)
+    extracted_hash = None
+    if os.path.exists(marker_path):
+        with open(marker_path, 'r') as marker_file:
+            extracted_hash = marker_file.read().strip()
+
+    if extracted_hash == archive_hash:
+        print(f"Archive unchanged, skipping extraction to {folder_name}.")
+    else:
+        with zipfile.ZipFile(archive_path) as zip_ref:
             zip_ref.extractall(folder_name)
+        with open(marker_path, 'w') as marker_file:
+            marker_file.write(archive_hash)
+
+    # Step 3: List the extracted files
+    extracted_files = [file for file in os.listdir(folder_name) if file != EXTRACTED_ARCHIVE_MARKER]
+
+    # If specific file is provided, check if it exists
+    if specific_file:
+        # Enrich file path with folder name and .csv extension
+        file_name = f"{specific_file}.csv"  # Format like '24_25\\I1.csv'
 
-        # Step 3: List the extracted files
-        extracted_files = os.listdir(folder_name)
-
-        
-        # If specific file is provided, check if it exists
-        if specific_file:
-            # Enrich file path with folder name and .csv extension
-            file_name = f"{specific_file}.csv"  # Format like '24_25\\I1.csv'
-
-            if file_name.replace("\\", "/") in [file.replace("\\", "/") for file in extracted_files]:
-                print(f"File {file_name} found. Proceeding to process it.")
-                return [file_name]
-            else:
-                print(f"Error: {file_name} not found in the extracted files.")
-                return []  # Return empty list if file not found
+        if file_name.replace("\\", "/") in [file.replace("\\", "/") for file in extracted_files]:
+            print(f"File {file_name} found. Proceeding to process it.")
+            return [file_name]
         else:
-            # Return all extracted files with correct paths
-            return [os.path.join(folder_name, file) for file in extracted_files]
+            print(f"Error: {file_name} not found in the extracted files.")
+            return []  # Return empty list if file not found
     else:
-        print(f"Failed to download ZIP file. Status code: {response.status_code}")
-        exit()  # Exit if download fails
+        # Return all extracted files with correct paths
+        return [os.path.join(folder_name, file) for file in extracted_files]
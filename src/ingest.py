@@ -0,0 +1,202 @@
+import argparse
+import glob
+import time
+import pandas as pd
+from transform import parse_match_dates
+
+# Schema registry of the football-data columns: name -> (dtype, missing value policy)
+# Missing value policies:
+# - 'drop': rows with a missing value are dropped (e.g. empty trailing rows, unplayed matches)
+# - 'zero': missing values count as zero (match statistics)
+# - 'keep': missing values are kept as NaN / NaT (odds, referee, kick-off time)
+COLUMN_SCHEMA = {
+    'Div': ('category', 'keep'),
+    'Date': ('date', 'drop'),
+    'Time': ('string', 'keep'),
+    'HomeTeam': ('category', 'drop'),
+    'AwayTeam': ('category', 'drop'),
+    'FTHG': ('int8', 'drop'),
+    'FTAG': ('int8', 'drop'),
+    'FTR': ('category', 'keep'),
+    'HTHG': ('int8', 'zero'),
+    'HTAG': ('int8', 'zero'),
+    'HTR': ('category', 'keep'),
+    'Referee': ('category', 'keep'),
+    'HS': ('int16', 'zero'),
+    'AS': ('int16', 'zero'),
+    'HST': ('int16', 'zero'),
+    'AST': ('int16', 'zero'),
+    'HF': ('int16', 'zero'),
+    'AF': ('int16', 'zero'),
+    'HC': ('int16', 'zero'),
+    'AC': ('int16', 'zero'),
+    'HY': ('int8', 'zero'),
+    'AY': ('int8', 'zero'),
+    'HR': ('int8', 'zero'),
+    'AR': ('int8', 'zero'),
+    'B365H': ('float32', 'keep'),
+    'B365D': ('float32', 'keep'),
+    'B365A': ('float32', 'keep'),
+    'PSH': ('float32', 'keep'),
+    'PSD': ('float32', 'keep'),
+    'PSA': ('float32', 'keep'),
+    'AvgH': ('float32', 'keep'),
+    'AvgD': ('float32', 'keep'),
+    'AvgA': ('float32', 'keep'),
+    'MaxH': ('float32', 'keep'),
+    'MaxD': ('float32', 'keep'),
+    'MaxA': ('float32', 'keep'),
+    'B365CH': ('float32', 'keep'),
+    'B365CD': ('float32', 'keep'),
+    'B365CA': ('float32', 'keep'),
+    'PSCH': ('float32', 'keep'),
+    'PSCD': ('float32', 'keep'),
+    'PSCA': ('float32', 'keep'),
+    'AvgCH': ('float32', 'keep'),
+    'AvgCD': ('float32', 'keep'),
+    'AvgCA': ('float32', 'keep'),
+}
+
+# Column names of older seasons and of the extra leagues, mapped to the current names
+COLUMN_ALIASES = {
+    'HT': 'HomeTeam',
+    'AT': 'AwayTeam',
+    'Home': 'HomeTeam',
+    'Away': 'AwayTeam',
+    'HG': 'FTHG',
+    'AG': 'FTAG',
+    'Res': 'FTR',
+    'BbAvH': 'AvgH',
+    'BbAvD': 'AvgD',
+    'BbAvA': 'AvgA',
+    'BbMxH': 'MaxH',
+    'BbMxD': 'MaxD',
+    'BbMxA': 'MaxA',
+}
+
+# Named column sets, combined to select what is loaded
+COLUMN_SETS = {
+    'core': ['Div', 'Date', 'Time', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG', 'FTR', 'HTHG', 'HTAG', 'HTR'],
+    'stats': ['HS', 'AS', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HY', 'AY', 'HR', 'AR'],
+    'referee': ['Referee'],
+    'odds': ['B365H', 'B365D', 'B365A', 'PSH', 'PSD', 'PSA', 'AvgH', 'AvgD', 'AvgA', 'MaxH', 'MaxD', 'MaxA'],
+    'closing_odds': ['B365CH', 'B365CD', 'B365CA', 'PSCH', 'PSCD', 'PSCA', 'AvgCH', 'AvgCD', 'AvgCA'],
+}
+
+# Columns needed by the pipeline (xG, points, expected points, team stats and form)
+PIPELINE_COLUMN_SETS = ('core', 'stats')
+
+
+# Function to map a raw CSV header to the current column name
+def canonical_column_name(name):
+    name = name.strip().lstrip('\ufeff')
+    return COLUMN_ALIASES.get(name, name)
+
+
+# Function to list the columns of the given column sets
+def resolve_columns(column_sets=PIPELINE_COLUMN_SETS, columns=None):
+    selected = [col for column_set in column_sets for col in COLUMN_SETS[column_set]]
+    selected += list(columns or [])
+    return list(dict.fromkeys(selected))
+
+
+def read_matches_csv(source, column_sets=PIPELINE_COLUMN_SETS, columns=None, **read_csv_kwargs):
+    """
+    Read a football-data CSV file with only the needed columns and compact dtypes.
+
+    Columns are selected from the schema registry through column sets (see COLUMN_SETS) and
+    extra column names. Older column names are mapped to the current ones, columns missing
+    from a season are skipped, and the missing value policy of each column is applied.
+
+    Parameters:
+    - source (str or file): Path or binary file object of the CSV file (e.g. a ZIP member).
+    - column_sets (tuple): Names of the column sets to load.
+    - columns (list): Additional columns to load.
+    - read_csv_kwargs: Extra arguments passed to pandas.read_csv.
+
+    Returns:
+    - df (DataFrame): The matches, with parsed dates, categorical teams and small integer counts.
+    """
+    wanted = set(resolve_columns(column_sets, columns))
+
+    # Counts are parsed as floats first, because missing values are only handled after reading
+    read_dtypes = {}
+    for name, (dtype, _) in COLUMN_SCHEMA.items():
+        read_dtypes[name] = 'float32' if dtype.startswith('int') else 'string' if dtype in ('date', 'string', 'category') else dtype
+    for alias, name in COLUMN_ALIASES.items():
+        read_dtypes[alias] = read_dtypes[name]
+
+    read_csv_kwargs.setdefault('encoding', 'utf-8-sig')
+    read_csv_kwargs.setdefault('encoding_errors', 'replace')
+    df = pd.read_csv(
+        source,
+        usecols=lambda name: canonical_column_name(name) in wanted,
+        dtype=read_dtypes,
+        **read_csv_kwargs
+    )
+    # A file can have a column under both its current name and an alias (e.g. 'AvgH' and 'BbAvH'):
+    # the current name is kept, and of several aliases of a missing column the first one
+    names = [name.strip().lstrip('\ufeff') for name in df.columns]
+    duplicate_aliases = [col for col, name in zip(df.columns, names) if COLUMN_ALIASES.get(name) in names]
+    df = df.drop(columns=duplicate_aliases).rename(columns=canonical_column_name)
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    # Apply the missing value policy and the final dtype of each column
+    drop_columns = [col for col in df.columns if COLUMN_SCHEMA.get(col, (None, 'keep'))[1] == 'drop']
+    df = df.dropna(subset=drop_columns).reset_index(drop=True)
+
+    for col in df.columns:
+        dtype, policy = COLUMN_SCHEMA.get(col, (None, 'keep'))
+        if dtype == 'date':
+            df[col] = parse_match_dates(df[col])
+        elif dtype is not None and dtype.startswith('int'):
+            if policy == 'zero':
+                df[col] = df[col].fillna(0)
+            # Columns that still have missing values use the nullable integer type (e.g. Int8)
+            df[col] = df[col].astype(dtype.capitalize() if df[col].isna().any() else dtype)
+        elif dtype == 'category':
+            df[col] = df[col].str.strip().astype('category')
+
+    return df
+
+
+# Function to compare the memory use and parse time of read_matches_csv with a plain pandas.read_csv
+def ingestion_report(paths, column_sets=PIPELINE_COLUMN_SETS):
+    rows = []
+    for path in paths:
+        start_time = time.perf_counter()
+        plain = pd.read_csv(path, encoding='utf-8-sig', encoding_errors='replace')
+        plain_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        typed = read_matches_csv(path, column_sets)
+        typed_seconds = time.perf_counter() - start_time
+
+        rows.append({
+            'File': path,
+            'Rows': len(typed),
+            'Plain_Columns': plain.shape[1],
+            'Typed_Columns': typed.shape[1],
+            'Plain_MB': plain.memory_usage(deep=True).sum() / 1e6,
+            'Typed_MB': typed.memory_usage(deep=True).sum() / 1e6,
+            'Plain_Seconds': plain_seconds,
+            'Typed_Seconds': typed_seconds,
+        })
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report memory use and parse time of the typed CSV ingestion.")
+    parser.add_argument('paths', nargs='+', help="CSV files or glob patterns (e.g. '*_*/*.csv').")
+    parser.add_argument('--sets', type=str, default=','.join(PIPELINE_COLUMN_SETS), help="Column sets to load.")
+    args = parser.parse_args()
+
+    paths = sorted(path for pattern in args.paths for path in glob.glob(pattern))
+    report = ingestion_report(paths, tuple(args.sets.split(',')))
+    print(report.to_string(index=False))
+
+    totals = report[['Rows', 'Plain_MB', 'Typed_MB', 'Plain_Seconds', 'Typed_Seconds']].sum()
+    print(f"\nTotal: {int(totals['Rows'])} matches in {len(report)} files")
+    print(f"Memory: {totals['Plain_MB']:.1f} MB -> {totals['Typed_MB']:.1f} MB")
+    print(f"Parse time: {totals['Plain_Seconds']:.2f}s -> {totals['Typed_Seconds']:.2f}s")
@@ -1,4 +1,14 @@
 import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from transform import parse_match_dates
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
 
 def save_team_stats_to_parquet(team_stats, folder_name, csv_file_path):
     # Ensure the folder for saving the Parquet file exists
@@ -15,6 +25,7 @@ def save_team_stats_to_parquet(team_stats, folder_name, csv_file_path):
     team_stats.to_parquet(save_path)
 
     print(f"Data saved to {save_path}")
+    return save_path
 
 
 def save_team_stats_to_csv(team_stats, folder_name, csv_file_path):
@@ -22,7 +33,8 @@ def save_team_stats_to_csv(team_stats, folder_name, csv_file_path):
     save_folder = os.path.join(folder_name, 'processed_csv_data')
     os.makedirs(save_folder, exist_ok=True)  # Create folder if it doesn't exist
 
-    # Convert specified columns to integers
+    # Convert specified columns to integers (on a copy, so the caller's team_stats keep their precision)
+    team_stats = team_stats.copy()
     columns_to_convert = ['ExpectedPoints_Prob', 'ExpectedPoints_xG', 'xG_Scored', 'xG_Conceded']
     for col in columns_to_convert:
         if col in team_stats.columns:
@@ -37,4 +49,180 @@ def save_team_stats_to_csv(team_stats, folder_name, csv_file_path):
     # Save the dataframe as a CSV file
     team_stats.to_csv(save_path, index=False)
 
-    print(f"Data saved to {save_path}")
\ No newline at end of file
+    print(f"Data saved to {save_path}")
+    return save_path
+
+# Build the path of a file saved next to the team stats Parquet file (e.g. 'I1_matches.parquet')
+def _processed_data_path(folder_name, csv_file_path, suffix):
+    save_folder = os.path.join(folder_name, 'processed_data')
+    base_filename = os.path.basename(csv_file_path).replace('.csv', f'{suffix}.parquet')
+    return os.path.join(save_folder, base_filename)
+
+
+def save_match_history(df, folder_name, csv_file_path):
+    # Save the per-match derived columns so later runs only need to process new matches
+    save_path = _processed_data_path(folder_name, csv_file_path, '_matches')
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    df.to_parquet(save_path, index=False)
+
+    print(f"Data saved to {save_path}")
+    return save_path
+
+
+def load_match_history(folder_name, csv_file_path):
+    # Returns None if no match history was saved yet
+    load_path = _processed_data_path(folder_name, csv_file_path, '_matches')
+    if not os.path.exists(load_path):
+        return None
+    return pd.read_parquet(load_path)
+
+
+def save_team_totals(team_totals, folder_name, csv_file_path):
+    # Save the per-team home/away accumulators that new matches are folded into
+    save_path = _processed_data_path(folder_name, csv_file_path, '_totals')
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    team_totals.to_parquet(save_path, index=False)
+
+    print(f"Data saved to {save_path}")
+    return save_path
+
+
+def load_team_totals(folder_name, csv_file_path):
+    # Returns None if no team totals were saved yet
+    load_path = _processed_data_path(folder_name, csv_file_path, '_totals')
+    if not os.path.exists(load_path):
+        return None
+    return pd.read_parquet(load_path)
+
+
+# Compact column types of the match store: counts as small integers, teams as categories
+MATCH_STORE_INT8_COLUMNS = ['FTHG', 'FTAG', 'HTHG', 'HTAG', 'HY', 'AY', 'HR', 'AR', 'HomePoints', 'AwayPoints']
+MATCH_STORE_INT16_COLUMNS = ['HS', 'AS', 'HST', 'AST', 'HF', 'AF', 'HC', 'AC', 'HO', 'AO', 'HBP', 'ABP']
+MATCH_STORE_CATEGORY_COLUMNS = ['Div', 'HomeTeam', 'AwayTeam', 'FTR', 'HTR', 'Referee']
+
+# League and season partitions are always read back as strings (e.g. season '0304', not 304)
+MATCH_STORE_PARTITIONING = ds.partitioning(pa.schema([('League', pa.string()), ('Season', pa.string())]), flavor='hive')
+
+# Unified schema of all partitions, kept up to date by every write (files starting with '_' are not
+# read as data), so a query does not have to open the footer of every partition file
+MATCH_STORE_SCHEMA_FILE = '_common_metadata'
+
+
+# Function to convert a match DataFrame to the typed layout of the match store.
+# With a team index (teams.TeamIndex), stable integer team IDs are stored next to the team names.
+def prepare_match_store_frame(df, league, season, team_index=None):
+    matches = df.copy()
+    matches['Date'] = parse_match_dates(matches['Date'])
+
+    for columns, dtype in [(MATCH_STORE_INT8_COLUMNS, 'int8'), (MATCH_STORE_INT16_COLUMNS, 'int16')]:
+        for col in columns:
+            if col in matches.columns:
+                values = pd.to_numeric(matches[col], errors='coerce')
+                # Keep missing values with a nullable integer type
+                matches[col] = values.astype(dtype.capitalize() if values.isna().any() else dtype)
+
+    for col in MATCH_STORE_CATEGORY_COLUMNS:
+        if col in matches.columns:
+            matches[col] = matches[col].astype('category')
+
+    # Remaining text columns (e.g. Time) are stored as strings
+    for col in matches.columns[matches.dtypes == object]:
+        matches[col] = matches[col].astype('string')
+
+    if team_index is not None:
+        matches['HomeTeamID'] = team_index.encode(matches['HomeTeam'])
+        matches['AwayTeamID'] = team_index.encode(matches['AwayTeam'])
+
+    matches['League'] = league
+    matches['Season'] = season
+    return matches
+
+
+def save_matches_to_store(df, store_folder, league, season, team_index=None):
+    # Write the matches of one league and season to the partitioned match store,
+    # replacing the previous version of the same partition
+    matches = prepare_match_store_frame(df, league, season, team_index)
+    matches.to_parquet(
+        store_folder, index=False, partition_cols=['League', 'Season'],
+        existing_data_behavior='delete_matching'
+    )
+
+    partition_path = os.path.join(store_folder, f'League={league}', f'Season={season}')
+    update_store_schema(store_folder, partition_path)
+    print(f"Data saved to {partition_path}")
+    return partition_path
+
+
+# Function to unify the schema of a newly written partition into the schema file of the match store.
+# A lock file serializes the updates of parallel processes (e.g. backfill tasks), so no column is lost.
+def update_store_schema(store_folder, partition_path):
+    schema_path = os.path.join(store_folder, MATCH_STORE_SCHEMA_FILE)
+    with open(schema_path + '.lock', 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            schemas = [pq.read_schema(os.path.join(partition_path, name)) for name in sorted(os.listdir(partition_path))]
+            if os.path.exists(schema_path):
+                schemas.insert(0, pq.read_schema(schema_path))
+            schema = pa.unify_schemas(schemas, promote_options='permissive')
+
+            # Written next to the store and renamed, so queries never read a partial file
+            pq.write_metadata(schema, schema_path + '.tmp')
+            os.replace(schema_path + '.tmp', schema_path)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def read_matches_from_store(store_folder, columns=None, filters=None):
+    """
+    Read matches from the partitioned match store. Only the requested columns are read, and
+    the filters are pushed down to the Parquet reader, so partitions (League, Season) and row
+    groups that cannot match are skipped.
+
+    Parameters:
+    - store_folder (str): Root folder of the match store.
+    - columns (list): Columns to read, all columns if None.
+    - filters (list): Filters in the pyarrow format, e.g. [('League', '=', 'I1'), ('Date', '>=', pd.Timestamp('2010-07-01'))].
+
+    Seasons have different column sets (e.g. odds or referees only in later seasons), so the
+    store is read with the unified schema saved by save_matches_to_store: columns missing from
+    a partition are read as nulls instead of being dropped. Stores written before the schema
+    file existed are unified over all their files instead.
+    """
+    schema_path = os.path.join(store_folder, MATCH_STORE_SCHEMA_FILE)
+    if os.path.exists(schema_path):
+        schemas = [pq.read_schema(schema_path)]
+    else:
+        dataset = ds.dataset(store_folder, format='parquet', partitioning=MATCH_STORE_PARTITIONING)
+        schemas = [fragment.physical_schema for fragment in dataset.get_fragments()]
+    schema = pa.unify_schemas(schemas + [MATCH_STORE_PARTITIONING.schema], promote_options='permissive')
+
+    dataset = ds.dataset(store_folder, schema=schema, format='parquet', partitioning=MATCH_STORE_PARTITIONING)
+    table = dataset.to_table(columns=columns, filter=pq.filters_to_expression(filters) if filters else None)
+    return table.to_pandas()
+
+
+# Function to query the match store by league, season, date range and home/away team
+# (teams can also be selected by team ID, for partitions written with a team index)
+def query_matches(store_folder, leagues=None, seasons=None, since=None, until=None, home_teams=None, away_teams=None, columns=None,
+                  home_team_ids=None, away_team_ids=None):
+    filters = []
+    if leagues:
+        filters.append(('League', 'in', list(leagues)))
+    if seasons:
+        filters.append(('Season', 'in', list(seasons)))
+    if since is not None:
+        filters.append(('Date', '>=', pd.Timestamp(since)))
+    if until is not None:
+        filters.append(('Date', '<=', pd.Timestamp(until)))
+    if home_teams:
+        filters.append(('HomeTeam', 'in', list(home_teams)))
+    if away_teams:
+        filters.append(('AwayTeam', 'in', list(away_teams)))
+    if home_team_ids:
+        filters.append(('HomeTeamID', 'in', [int(team_id) for team_id in home_team_ids]))
+    if away_team_ids:
+        filters.append(('AwayTeamID', 'in', [int(team_id) for team_id in away_team_ids]))
+
+    return read_matches_from_store(store_folder, columns=columns, filters=filters or None)
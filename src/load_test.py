@@ -0,0 +1,105 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import urlencode
+import numpy as np
+
+
+async def request(reader, writer, method, target, payload=None):
+    # Send one keep-alive HTTP/1.1 request and return the status code and decoded JSON body
+    body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+    writer.write(
+        f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers['content-length'])))
+
+
+async def run_client(host, port, targets, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for method, target, payload in targets:
+            start_time = time.perf_counter()
+            status, _ = await request(reader, writer, method, target, payload)
+            latencies.append(time.perf_counter() - start_time)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load_test(host='127.0.0.1', port=8080, n_requests=10000, concurrency=16, batch_size=0, seed=0):
+    """
+    Send random prediction requests to a running prediction service and measure them.
+
+    Every client holds one keep-alive connection and sends its requests one after the
+    other. With batch_size > 0 the clients send POST /predict/batch requests of that many
+    fixtures instead of GET /predict requests.
+
+    Returns a dictionary with the request count, errors, requests/sec and the p50, p99
+    and maximum latencies in milliseconds.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    _, tables = await request(reader, writer, 'GET', '/tables')
+    writer.close()
+    if not tables:
+        raise ValueError("The prediction service has no team stats loaded")
+
+    rng = random.Random(seed)
+    targets = []
+    for _ in range(n_requests):
+        table = rng.choice(tables)
+        fixtures = [rng.sample(table['teams'], 2) for _ in range(max(batch_size, 1))]
+        if batch_size:
+            payload = {'league': table['league'], 'season': table['season'], 'fixtures': fixtures}
+            targets.append(('POST', '/predict/batch', payload))
+        else:
+            query = urlencode({'league': table['league'], 'season': table['season'], 'home': fixtures[0][0], 'away': fixtures[0][1]})
+            targets.append(('GET', f"/predict?{query}", None))
+
+    latencies = []
+    errors = []
+    start_time = time.perf_counter()
+    await asyncio.gather(*(
+        run_client(host, port, targets[i::concurrency], latencies, errors) for i in range(concurrency)
+    ))
+    seconds = time.perf_counter() - start_time
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': seconds,
+        'requests_per_second': len(latencies) / seconds,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p99_ms': float(np.percentile(latencies_ms, 99)),
+        'max_ms': float(latencies_ms.max()),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test a running prediction service.")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help="Host of the prediction service.")
+    parser.add_argument('--port', type=int, default=8080, help="Port of the prediction service.")
+    parser.add_argument('--requests', type=int, default=10000, help="Total number of requests.")
+    parser.add_argument('--concurrency', type=int, default=16, help="Number of concurrent connections.")
+    parser.add_argument('--batch-size', type=int, default=0, help="Fixtures per batch request (0 for single predictions).")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the requested fixtures.")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load_test(args.host, args.port, args.requests, args.concurrency, args.batch_size, args.seed))
+    print(f"=== Load test ({result['requests']} requests, {args.concurrency} connections) ===")
+    print(f"Requests/sec: {result['requests_per_second']:.0f}")
+    print(f"Latency p50: {result['p50_ms']:.3f} ms, p99: {result['p99_ms']:.3f} ms, max: {result['max_ms']:.3f} ms")
+    print(f"Errors: {result['errors']}")
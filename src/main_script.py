@@ -1,12 +1,28 @@
 import argparse
 import os
-import pandas as pd
+import sys
 import json
-from extract import download_and_extract_zip
-from transform import calculate_xg, calculate_expected_points_poisson, aggregate_team_stats, calculate_points, calculate_form, calculate_expected_points
-from load import save_team_stats_to_parquet, save_team_stats_to_csv
-from predict import predict_match_with_suggestions
-from visualization import visualize_team_performance
+from contextlib import contextmanager
+from metrics import StageMetrics, path_size
+
+# Heavy dependencies (pandas, pyarrow, scipy, matplotlib, seaborn) are imported inside the functions
+# of the stages that need them, so each subcommand only loads its own stack.
+
+# Subcommands of the command-line interface, other arguments run the whole pipeline (legacy invocation)
+COMMANDS = ('fetch', 'transform', 'predict', 'plot')
+
+# Chart modes of process_file: show the chart window, save the chart file, leave it to a later
+# batch (backfill or the plot subcommand) or skip the chart
+CHART_MODES = ('show', 'save', 'defer', 'off')
+
+# Print the error of a failed run and exit with status 1, so schedulers (cron, CI) see the failure
+@contextmanager
+def exit_on_error(description):
+    try:
+        yield
+    except Exception as e:
+        print(f"Error {description}: {e}")
+        sys.exit(1)
 
 # Load configuration from the config.json file
 def load_config(config_path='config.json'):
@@ -14,89 +30,303 @@ def load_config(config_path='config.json'):
         config = json.load(config_file)
     return config
 
-def process_file(season_year, specific_file, home_team, away_team, config):
-    print(f"Starting process for season {season_year} and file {specific_file}...")
+# Read the league CSV of a season, either streamed from the cached ZIP or from the extracted folder.
+# Returns the matches and the number of bytes downloaded.
+def load_league_data(url, folder_name, formatted_file_name, config, offline=False):
+    from extract import download_and_extract_zip, fetch_zip, open_zip_member
+    from ingest import read_matches_csv
+
+    cache_folder = config.get("cache_folder")
+    archive_path, _, downloaded_bytes = fetch_zip(url, cache_folder, offline, config.get("cache_max_age", 0))
+
+    if config.get("extract_mode", "stream") == "stream":
+        # Parse only the requested member of the cached ZIP, without extracting it
+        with open_zip_member(archive_path, formatted_file_name) as csv_file:
+            print(f"Processing specific file: {formatted_file_name}...")
+            return read_matches_csv(csv_file), downloaded_bytes
 
+    # Extract the whole ZIP (already in the cache) to the season folder and read the CSV from disk
+    download_and_extract_zip(url, folder_name, cache_folder=cache_folder, offline=True)
+    extracted_files = os.listdir(folder_name)
+    if formatted_file_name not in extracted_files:
+        raise FileNotFoundError(f"{formatted_file_name} not found in extracted files.")
+
+    print(f"Processing specific file: {formatted_file_name}...")
+    return read_matches_csv(os.path.join(folder_name, formatted_file_name)), downloaded_bytes
+
+# Build the URL, season folder, file name and CSV path of a league file of a season
+def season_file_paths(season_year, specific_file, config):
     # Construct URL using the base URL from config
     url = config["base_url"].format(season_year=season_year)
     folder_name = f"{season_year[:2]}_{season_year[2:]}"
-    
-    # Extract phase
-    print(f"Extracting data from {url}...")
-    extracted_files = download_and_extract_zip(url, folder_name)
-    extracted_files = os.listdir(folder_name)
 
     # Construct file path using file format from config
     formatted_file_name = config["file_format"].format(season_year=season_year, file_name=specific_file)
-    if formatted_file_name in extracted_files:
-        print(f"Processing specific file: {formatted_file_name}...")
-        csv_file_path = os.path.join(folder_name, formatted_file_name)
-
-        try:
-            # Read the CSV file
-            df = pd.read_csv(csv_file_path)
-            
-            # Transform phase
-            df = calculate_xg(df)
-
-            # Calculate expected points using Poisson probabilities
-            df[['Home_xP_Poisson', 'Away_xP_Poisson']] = df.apply(
-                lambda row: pd.Series(calculate_expected_points_poisson(row['Home_xG_scored'], row['Away_xG_scored'])),
-                axis=1
+    csv_file_path = os.path.join(folder_name, formatted_file_name)
+    return url, folder_name, formatted_file_name, csv_file_path
+
+# Path of a Parquet file saved by process_file (suffix '' for the team stats, '_matches' for the match history)
+def saved_parquet_path(season_year, specific_file, config, suffix=''):
+    _, folder_name, formatted_file_name, _ = season_file_paths(season_year, specific_file, config)
+    return os.path.join(folder_name + "_parquet", 'processed_data', formatted_file_name.replace('.csv', f'{suffix}.parquet'))
+
+# Run the extract, transform and load phases for one league file of a season.
+# Errors are raised to the caller, which decides how to report them.
+# Stage metrics go to the given StageMetrics recorder, or to the sinks configured in config.
+def process_file(season_year, specific_file, home_team, away_team, config, offline=False, show_plot=True,
+                 incremental=False, verify_incremental=False, metrics=None):
+    import pandas as pd
+    from transform import (calculate_match_columns, accumulate_team_totals, fold_team_totals, finalize_team_stats,
+                           aggregate_team_stats, calculate_form, select_new_matches)
+    from load import (save_team_stats_to_parquet, save_team_stats_to_csv, save_match_history, load_match_history,
+                      save_team_totals, load_team_totals, save_matches_to_store)
+    from teams import locked_team_index
+
+    print(f"Starting process for season {season_year} and file {specific_file}...")
+    if metrics is None:
+        metrics = StageMetrics.from_config(config, {'season': season_year, 'league': specific_file})
+
+    url, folder_name, formatted_file_name, csv_file_path = season_file_paths(season_year, specific_file, config)
+
+    # Extract phase
+    with metrics.stage('extract') as record:
+        print(f"Extracting data from {url}...")
+        df, record['bytes_downloaded'] = load_league_data(url, folder_name, formatted_file_name, config, offline)
+        record['rows_out'] = len(df)
+
+    # Transform phase
+    with metrics.stage('transform', rows_in=len(df)) as record:
+        parquet_folder = folder_name + "_parquet"
+        max_goals = config.get("max_goals", 6)
+        previous_df = load_match_history(parquet_folder, csv_file_path) if incremental else None
+        team_totals = load_team_totals(parquet_folder, csv_file_path) if incremental else None
+
+        # Matches of the history that were removed from the CSV or edited in it (e.g. a corrected result) need a full rebuild
+        history_usable = previous_df is not None and team_totals is not None and len(select_new_matches(
+            previous_df, df, [column for column in df.columns if column in previous_df.columns]
+        )) == 0
+        if history_usable:
+            # Incremental mode: only the matches added since the previous run are transformed
+            new_matches = select_new_matches(df, previous_df)
+            print(f"Incremental update: {len(new_matches)} new matches.")
+            full_df = df
+            df = previous_df
+            if len(new_matches) > 0:
+                new_matches = calculate_match_columns(new_matches, max_goals=max_goals)
+                df = pd.concat([previous_df, new_matches], ignore_index=True)
+                team_totals = fold_team_totals(team_totals, accumulate_team_totals(new_matches))
+        else:
+            # Steps 1-2: Calculate xG, points and expected points for all matches
+            full_df = None
+            df = calculate_match_columns(df, max_goals=max_goals)
+            team_totals = accumulate_team_totals(df)
+
+        # Step 3: Calculate team stats (including Rank)
+        team_stats = finalize_team_stats(team_totals)
+
+        # Check that the incremental update matches a full rebuild
+        if verify_incremental and full_df is not None:
+            rebuilt_team_stats = aggregate_team_stats(calculate_match_columns(full_df, max_goals=max_goals))
+            pd.testing.assert_frame_equal(
+                team_stats.reset_index(drop=True), rebuilt_team_stats.reset_index(drop=True),
+                check_dtype=False, rtol=1e-9
             )
+            print("Incremental update verified against a full rebuild.")
+        elif verify_incremental:
+            print("Incremental verification skipped: no usable saved history, the team stats were rebuilt from all matches.")
+
+        # Step 4: Calculate Form
+        form_data = calculate_form(df)
+
+        # Step 5: Merge Form into team_stats
+        team_stats = team_stats.merge(form_data, on='Team', how='left')
+        record['rows_out'] = len(team_stats)
+
+        # Step 6: Register the season's teams in the persistent team index
+        team_index = None
+        if config.get("team_index_file"):
+            with locked_team_index(config["team_index_file"]) as team_index:
+                team_index.register_matches(df, season_year, specific_file)
+
+    # Print the ranking dataset
+    print("\n=== Team Rankings ===")
+    print(team_stats.sort_values(by=['Points', 'GD', 'GF'], ascending=[False, False, False]))
 
-            # Step 1: Calculate points for each match
-            df[['HomePoints', 'AwayPoints']] = df.apply(calculate_points, axis=1)
-
-            # Step 2: Calculate xG for all matches
-            df = calculate_xg(df)
-            df = calculate_expected_points(df)
-            # Step 3: Calculate team stats (including Rank)
-            team_stats = aggregate_team_stats(df)
-
-            # Step 4: Calculate Form
-            form_data = calculate_form(df)
-
-
-            # Step 5: Merge Form into team_stats
-            team_stats = team_stats.merge(form_data, on='Team', how='left')
-
-            # Print the ranking dataset
-            print("\n=== Team Rankings ===")
-            print(team_stats.sort_values(by=['Points', 'GD', 'GF'], ascending=[False, False, False]))
-        
-            # Predict match result if teams are provided
-            if home_team and away_team:
-                predicted_home_goals, predicted_away_goals, suggestions = predict_match_with_suggestions(team_stats, home_team, away_team)
-                print(f"\nPredicted result: {home_team} {predicted_home_goals} - {predicted_away_goals} {away_team}")
-                print("Top 3 likely results:")
-                for home, away, prob in suggestions:
-                    print(f"{home}-{away} ({prob:.2f}% chance)")
-
-            # Load phase
-            print(f"\nSaving processed data for {csv_file_path} to Parquet...")
-            save_team_stats_to_parquet(team_stats, folder_name +  "_parquet", csv_file_path)
-            save_team_stats_to_csv(team_stats, folder_name + "_csv", csv_file_path)
-            visualize_team_performance(team_stats)
-
-        except Exception as e:
-            print(f"Error while processing {csv_file_path}: {e}")
-    else:
-        print(f"Error: {formatted_file_name} not found in extracted files.")
-
-def main(season_year, specific_file=None, home_team=None, away_team=None):
-    # Load configuration from the config file
+    # Predict match result if teams are provided
+    if home_team and away_team:
+        with metrics.stage('predict', rows_in=len(team_stats)) as record:
+            record['rows_out'] = predict_and_print(team_stats, df, home_team, away_team, config, team_index)
+
+    # Load phase
+    with metrics.stage('load', rows_in=len(df)) as record:
+        print(f"\nSaving processed data for {csv_file_path} to Parquet...")
+        saved_paths = [
+            save_team_stats_to_parquet(team_stats, parquet_folder, csv_file_path),
+            save_match_history(df, parquet_folder, csv_file_path),
+            save_team_totals(team_totals, parquet_folder, csv_file_path),
+            save_team_stats_to_csv(team_stats, folder_name + "_csv", csv_file_path),
+        ]
+        if config.get("match_store_folder"):
+            saved_paths.append(save_matches_to_store(df, config["match_store_folder"], specific_file, season_year, team_index))
+        record['bytes_written'] = sum(path_size(path) for path in saved_paths)
+
+    # Charts: shown in a window, saved headless, deferred to a later batch or skipped
+    chart_mode = config.get("charts", "show") if show_plot else "off"
+    if chart_mode in ("show", "save"):
+        with metrics.stage('plot', rows_in=len(team_stats)) as record:
+            path = plot_team_stats(team_stats, season_year, specific_file, config, chart_mode)
+            record['bytes_written'] = path_size(path) if path else None
+
+    return team_stats
+
+# Predict a match from team_stats (and the season's matches for the 'ratings' model) and print the result.
+# Returns the number of suggested results.
+def predict_and_print(team_stats, df, home_team, away_team, config, team_index=None):
+    from predict import predict_match_with_suggestions
+
+    # The 'ratings' model fits attack/defence ratings on the season's matches instead of the team_stats formula
+    ratings = None
+    if config.get("prediction_model", "formula") == "ratings":
+        from ratings import fit_ratings, DEFAULT_DECAY_RATE
+        ratings = fit_ratings(df, decay_rate=config.get("rating_decay_rate", DEFAULT_DECAY_RATE))
+
+    predicted_home_goals, predicted_away_goals, suggestions = predict_match_with_suggestions(
+        team_stats, home_team, away_team, max_goals=config.get("max_goals", 6), ratings=ratings, team_index=team_index
+    )
+    print(f"\nPredicted result: {home_team} {predicted_home_goals} - {predicted_away_goals} {away_team}")
+    print("Top 3 likely results:")
+    for home, away, prob in suggestions:
+        print(f"{home}-{away} ({prob:.2f}% chance)")
+    return len(suggestions)
+
+# Show the team performance chart, or save it and return its path
+def plot_team_stats(team_stats, season_year, specific_file, config, chart_mode="show"):
+    if chart_mode == "show":
+        from visualization import visualize_team_performance
+        visualize_team_performance(team_stats)
+        return None
+
+    from visualization import render_team_performance, chart_path
+    path = chart_path(config.get("chart_folder", "charts"), season_year, specific_file, config.get("chart_format", "png"))
+    render_team_performance(team_stats, path, f"{specific_file} {season_year}")
+    print(f"Chart saved to {path}")
+    return path
+
+def main(season_year, specific_file=None, home_team=None, away_team=None, offline=False,
+         incremental=False, verify_incremental=False, metrics_file=None, profile_folder=None, trace_memory=False, charts=None):
+    # Load configuration from the config file, command-line instrumentation options take precedence
     config = load_config()
+    if metrics_file:
+        config["metrics_file"] = metrics_file
+    if profile_folder:
+        config["profile_folder"] = profile_folder
+    if trace_memory:
+        config["trace_memory"] = True
+    if charts:
+        config["charts"] = charts
 
     # Directly call the process_file function to process the specific file
-    process_file(season_year, specific_file, home_team, away_team, config)
+    with exit_on_error(f"while processing season {season_year} and file {specific_file}"):
+        process_file(season_year, specific_file, home_team, away_team, config, offline,
+                     incremental=incremental, verify_incremental=verify_incremental)
+
+# Subcommand 'fetch': download the season ZIP to the download cache
+def fetch_season(season_year, config, offline=False):
+    from extract import fetch_zip
+
+    url = config["base_url"].format(season_year=season_year)
+    archive_path, _, downloaded_bytes = fetch_zip(url, config.get("cache_folder"), offline, config.get("cache_max_age", 0))
+    print(f"Season {season_year} cached at {archive_path} ({downloaded_bytes} bytes downloaded)")
+    return archive_path
+
+# Subcommand 'predict': predict a match from the team stats saved by process_file, without reprocessing the season
+def predict_saved(season_year, specific_file, home_team, away_team, config):
+    import pandas as pd
+
+    team_stats = pd.read_parquet(saved_parquet_path(season_year, specific_file, config))
+    df = None
+    if config.get("prediction_model", "formula") == "ratings":
+        df = pd.read_parquet(saved_parquet_path(season_year, specific_file, config, '_matches'))
+
+    team_index = None
+    if config.get("team_index_file") and os.path.exists(config["team_index_file"]):
+        from teams import TeamIndex
+        team_index = TeamIndex.load(config["team_index_file"])
+
+    predict_and_print(team_stats, df, home_team, away_team, config, team_index)
+
+# Subcommand 'plot': show or save the chart of the team stats saved by process_file
+def plot_saved(season_year, specific_file, config, chart_mode="save"):
+    import pandas as pd
+
+    team_stats = pd.read_parquet(saved_parquet_path(season_year, specific_file, config))
+    return plot_team_stats(team_stats, season_year, specific_file, config, chart_mode)
+
+def run_command(args):
+    # Load configuration from the config file, command-line instrumentation options take precedence
+    config = load_config()
+    for option, key in [('metrics_file', 'metrics_file'), ('profile_folder', 'profile_folder'), ('trace_memory', 'trace_memory')]:
+        if getattr(args, option, None):
+            config[key] = getattr(args, option)
+
+    with exit_on_error(f"in {args.command} for season {args.season}"):
+        if args.command == 'fetch':
+            fetch_season(args.season, config, args.offline)
+        elif args.command == 'transform':
+            process_file(args.season, args.file, None, None, config, args.offline, show_plot=False,
+                         incremental=args.incremental or args.verify_incremental, verify_incremental=args.verify_incremental)
+        elif args.command == 'predict':
+            predict_saved(args.season, args.file, args.home, args.away, config)
+        elif args.command == 'plot':
+            plot_saved(args.season, args.file, config, args.charts)
+
+def build_command_parser():
+    parser = argparse.ArgumentParser(description="Run one stage of the football data pipeline.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    fetch_parser = subparsers.add_parser('fetch', help="Download the season ZIP to the download cache.")
+    transform_parser = subparsers.add_parser('transform', help="Extract, transform and save a league file (no prediction or chart).")
+    predict_parser = subparsers.add_parser('predict', help="Predict a match from the saved team stats.")
+    plot_parser = subparsers.add_parser('plot', help="Show or save the chart of the saved team stats.")
+
+    for command_parser in [fetch_parser, transform_parser, predict_parser, plot_parser]:
+        command_parser.add_argument('--season', type=str, required=True, help="The season/year part of the URL (e.g., '2425').")
+    for command_parser in [transform_parser, predict_parser, plot_parser]:
+        command_parser.add_argument('--file', type=str, required=True, help="League file of the season (e.g., 'I1').")
+    for command_parser in [fetch_parser, transform_parser]:
+        command_parser.add_argument('--offline', action='store_true', help="Serve the season ZIP from the download cache without network access.")
+
+    transform_parser.add_argument('--incremental', action='store_true', help="Only transform the matches added since the previous run.")
+    transform_parser.add_argument('--verify-incremental', action='store_true', help="Check the incremental update against a full rebuild.")
+    transform_parser.add_argument('--metrics-file', type=str, help="Append stage metrics as JSON lines to this file.")
+    transform_parser.add_argument('--profile-folder', type=str, help="Profile each stage with cProfile and save the statistics to this folder.")
+    transform_parser.add_argument('--trace-memory', action='store_true', help="Trace the peak memory of each stage with tracemalloc.")
+    predict_parser.add_argument('--home', type=str, required=True, help="Home team.")
+    predict_parser.add_argument('--away', type=str, required=True, help="Away team.")
+    plot_parser.add_argument('--charts', type=str, choices=['show', 'save'], default='save', help="Show the chart window or save the chart file.")
+    return parser
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        run_command(build_command_parser().parse_args())
+        sys.exit(0)
+
     # Parse command-line arguments
-    parser = argparse.ArgumentParser(description="Download and process football data for a specific season.")
+    parser = argparse.ArgumentParser(
+        description="Download and process football data for a specific season.",
+        epilog=f"Single stages run as subcommands: {', '.join(COMMANDS)} (e.g. 'main_script.py predict --help')."
+    )
     parser.add_argument('--season', type=str, required=True, help="The season/year part of the URL (e.g., '2425').")
     parser.add_argument('--file', type=str, required=True, help="Specific file to process from the ZIP archive.")
     parser.add_argument('--home', type=str, required=False, help="Home team for match prediction.")
     parser.add_argument('--away', type=str, required=False, help="Away team for match prediction.")
+    parser.add_argument('--offline', action='store_true', help="Serve the season ZIP from the download cache without network access.")
+    parser.add_argument('--incremental', action='store_true', help="Only transform the matches added since the previous run.")
+    parser.add_argument('--verify-incremental', action='store_true', help="Check the incremental update against a full rebuild.")
+    parser.add_argument('--metrics-file', type=str, help="Append stage metrics as JSON lines to this file.")
+    parser.add_argument('--profile-folder', type=str, help="Profile each stage with cProfile and save the statistics to this folder.")
+    parser.add_argument('--trace-memory', action='store_true', help="Trace the peak memory of each stage with tracemalloc.")
+    parser.add_argument('--charts', type=str, choices=CHART_MODES, help="Show, save, defer or skip the team performance chart.")
     
     args = parser.parse_args()
 
@@ -104,4 +334,6 @@ if __name__ == "__main__":
     print(f"Parsed arguments: {args}")
 
     # Ensure that main is called with the parsed arguments
-    main(args.season, args.file, args.home, args.away)
+    main(args.season, args.file, args.home, args.away, args.offline,
+         incremental=args.incremental or args.verify_incremental, verify_incremental=args.verify_incremental,
+         metrics_file=args.metrics_file, profile_folder=args.profile_folder, trace_memory=args.trace_memory, charts=args.charts)
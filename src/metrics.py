@@ -0,0 +1,133 @@
+import os
+import json
+import time
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+# Sink writing one JSON object per line to a metrics file
+class JsonLinesSink:
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, record):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(self.path, 'a') as metrics_file:
+            metrics_file.write(json.dumps(record, default=str) + '\n')
+
+
+# Function to calculate the size in bytes of a file, or of all files in a folder
+def path_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+# Function to get the high-water mark of the process memory: it never goes down, so it is not a per-stage value
+def _process_peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Function to get the current resident memory of the process, None where /proc is not available
+def _current_rss_mb():
+    try:
+        with open('/proc/self/statm', 'r') as statm_file:
+            resident_pages = int(statm_file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+class StageMetrics:
+    """
+    Record structured metrics for the stages of a pipeline run.
+
+    Each stage records its duration, rows in and out, bytes downloaded and written, the
+    change of the resident memory over the stage, the memory high-water mark of the process
+    so far and, with trace_memory, the peak memory traced by tracemalloc during the stage. Records are passed to every sink (any callable taking
+    a dictionary, e.g. JsonLinesSink). With profile_folder, each stage also runs under
+    cProfile and its statistics are dumped to '<profile_folder>/<run>_<stage>.prof'.
+
+    Parameters:
+    - sinks (list): Callables receiving each stage record.
+    - context (dict): Fields added to every record (e.g. season and league).
+    - profile_folder (str): Folder for the cProfile statistics, profiling is off if None.
+    - trace_memory (bool): Trace the peak memory of each stage with tracemalloc.
+    """
+
+    def __init__(self, sinks=None, context=None, profile_folder=None, trace_memory=False):
+        self.sinks = list(sinks or [])
+        self.context = dict(context or {})
+        self.profile_folder = profile_folder
+        self.trace_memory = trace_memory
+        self.records = []
+
+    @classmethod
+    def from_config(cls, config, context=None):
+        # Build the recorder from the 'metrics_file', 'profile_folder' and 'trace_memory' config entries
+        sinks = [JsonLinesSink(config["metrics_file"])] if config.get("metrics_file") else []
+        return cls(sinks, context, config.get("profile_folder"), config.get("trace_memory", False))
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        # The caller fills in 'rows_out', 'bytes_downloaded' and 'bytes_written' of the yielded record
+        record = dict(self.context)
+        record.update({
+            'stage': name, 'timestamp': time.time(), 'rows_in': rows_in, 'rows_out': None,
+            'bytes_downloaded': None, 'bytes_written': None, 'status': 'ok', 'error': None,
+        })
+
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+
+        profiler = cProfile.Profile() if self.profile_folder else None
+        start_rss = _current_rss_mb()
+        start_time = time.perf_counter()
+        if profiler:
+            profiler.enable()
+
+        try:
+            yield record
+        except Exception as e:
+            record['status'] = 'error'
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            record['duration_seconds'] = time.perf_counter() - start_time
+            end_rss = _current_rss_mb()
+            record['rss_mb'] = end_rss
+            record['rss_delta_mb'] = end_rss - start_rss if end_rss is not None and start_rss is not None else None
+            record['process_peak_rss_mb'] = _process_peak_rss_mb()
+
+            if self.trace_memory:
+                record['peak_traced_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+                if started_tracing:
+                    tracemalloc.stop()
+
+            if profiler:
+                os.makedirs(self.profile_folder, exist_ok=True)
+                run_name = '_'.join(str(value) for value in self.context.values())
+                profile_path = os.path.join(self.profile_folder, f"{run_name}_{name}.prof" if run_name else f"{name}.prof")
+                profiler.dump_stats(profile_path)
+                record['profile'] = profile_path
+
+            self.records.append(record)
+            for sink in self.sinks:
+                sink(record)
@@ -1,56 +1,125 @@
+import difflib
 import numpy as np
-from scipy.stats import poisson
+import pandas as pd
+from probability import poisson_pmf_row, poisson_pmf_table
+
+# Function to calculate the combined xG of a match from home and away team statistics
+# (works on single rows of team_stats as well as on arrays of stats for many fixtures)
+def calculate_match_xg(home_stats, away_stats):
+    home_xg = ((home_stats['xG_Scored'] / home_stats['Matches'] + away_stats['xG_Conceded'] / away_stats['Matches'])*0.5 + (home_stats['GF'] / home_stats['Matches'] + away_stats['GA'] / away_stats['Matches'])*0.5 - 1)*1.12
+    away_xg = ((away_stats['xG_Scored'] / away_stats['Matches'] + home_stats['xG_Conceded'] / home_stats['Matches'])*0.5 + (away_stats['GF'] / away_stats['Matches'] + home_stats['GA'] / home_stats['Matches'])*0.5 - 1)*0.93
+    return home_xg, away_xg
+
+# Function to calculate the expected number of goals from goal matrices, rounded to one decimal place
+def calculate_predicted_goals(goal_matrix, max_goals=6):
+    goals = np.arange(max_goals)
+    home_goals_probabilities = np.sum(goal_matrix, axis=-1)
+    away_goals_probabilities = np.sum(goal_matrix, axis=-2)
+
+    predicted_home_goals = np.sum(home_goals_probabilities * goals, axis=-1) / np.sum(home_goals_probabilities, axis=-1)
+    predicted_away_goals = np.sum(away_goals_probabilities * goals, axis=-1) / np.sum(away_goals_probabilities, axis=-1)
+
+    return np.round(predicted_home_goals, 1), np.round(predicted_away_goals, 1)
+
+# Function to build the error message of teams missing from team_stats, with the closest team names
+def _missing_teams_message(teams, known_teams):
+    known_teams = [str(team) for team in known_teams]
+    messages = []
+    for team in teams:
+        suggestions = difflib.get_close_matches(str(team), known_teams, n=3)
+        messages.append(f"{team} (did you mean: {', '.join(suggestions)}?)" if suggestions else str(team))
+    return f"Teams not found in team_stats: {', '.join(messages)}"
+
+# Function to map the team names of team_stats to their rows and, with a TeamIndex, the team IDs too
+# (the first row of a team wins). Build it once and pass it to find_team_stats for several lookups.
+def build_team_rows(team_stats, team_index=None):
+    teams = team_stats['Team'].astype(str).tolist()
+    name_rows = {team: row for row, team in reversed(list(enumerate(teams)))}
+    id_rows = None
+    if team_index is not None:
+        id_rows = {int(team_id): row for row, team_id in reversed(list(enumerate(team_index.encode(teams)))) if team_id >= 0}
+    return name_rows, id_rows
+
+# Function to find the row of a team in the team rows of build_team_rows, None if it is not found
+def _team_row(team, team_rows, team_index=None):
+    name_rows, id_rows = team_rows
+    row = name_rows.get(str(team))
+    if row is None and id_rows is not None and team in team_index:
+        row = id_rows.get(team_index.team_id(team))
+    return row
+
+# Function to look up the team_stats row of a team (with a TeamIndex, other spellings of the team match too)
+def find_team_stats(team_stats, team, team_index=None, team_rows=None):
+    if team_rows is None:
+        team_rows = build_team_rows(team_stats, team_index)
+    row = _team_row(team, team_rows, team_index)
+    if row is None:
+        raise KeyError(_missing_teams_message([team], team_stats['Team']))
+    return team_stats.iloc[row]
+
+# Function to translate team names to the spellings a TeamRatings was fitted on, through their team IDs
+def _ratings_team_names(ratings, teams, team_index):
+    teams = list(teams)
+    spellings = {team_id: team for team_id, team in zip(team_index.encode(ratings.teams), ratings.teams) if team_id >= 0}
+    return [
+        team if team in ratings.team_ids else spellings.get(team_id, team)
+        for team, team_id in zip(teams, team_index.encode(teams))
+    ]
 
 # Function to predict the exact score
-def predict_match_result(team_stats, home_team, away_team, max_goals=6):
+def predict_match_result(team_stats, home_team, away_team, max_goals=6, team_index=None):
     # Ensure that home_team and away_team exist in the team_stats DataFrame
-    home_stats = team_stats.loc[team_stats['Team'] == home_team].iloc[0]
-    away_stats = team_stats.loc[team_stats['Team'] == away_team].iloc[0]
+    team_rows = build_team_rows(team_stats, team_index)
+    home_stats = find_team_stats(team_stats, home_team, team_index, team_rows)
+    away_stats = find_team_stats(team_stats, away_team, team_index, team_rows)
 
     # Calculate combined xG for the match based on the proportion of goals scored/conceded
-    home_xg = ((home_stats['xG_Scored'] / home_stats['Matches'] + away_stats['xG_Conceded'] / away_stats['Matches'])*0.5 + (home_stats['GF'] / home_stats['Matches'] + away_stats['GA'] / away_stats['Matches'])*0.5 - 1)*1.12
-    away_xg = ((away_stats['xG_Scored'] / away_stats['Matches'] + home_stats['xG_Conceded'] / home_stats['Matches'])*0.5 + (away_stats['GF'] / away_stats['Matches'] + home_stats['GA'] / home_stats['Matches'])*0.5 - 1)*0.93
+    home_xg, away_xg = calculate_match_xg(home_stats, away_stats)
 
     # Calculate goal probabilities
     _, _, _, goal_matrix = calculate_match_outcome_probabilities(home_xg, away_xg, max_goals)
 
     # Calculate the expected number of goals as a weighted average
-    home_goals_probabilities = np.sum(goal_matrix, axis=1)
-    away_goals_probabilities = np.sum(goal_matrix, axis=0)
-
-    predicted_home_goals = np.sum(home_goals_probabilities * np.arange(max_goals)) / np.sum(home_goals_probabilities)
-    predicted_away_goals = np.sum(away_goals_probabilities * np.arange(max_goals)) / np.sum(away_goals_probabilities)
-
-    # Round the results to one decimal place
-    predicted_home_goals = round(predicted_home_goals, 1)
-    predicted_away_goals = round(predicted_away_goals, 1)
-
-    return predicted_home_goals, predicted_away_goals
+    return calculate_predicted_goals(goal_matrix, max_goals)
 
 # Function to calculate Poisson distribution probabilities
 def calculate_match_outcome_probabilities(home_xg, away_xg, max_goals=6):
-    home_win_prob = 0
-    draw_prob = 0
-    away_win_prob = 0
-    goal_matrix = np.zeros((max_goals, max_goals))  # Matrix to store goal probabilities
+    # Goal probabilities of both teams, cached per xG value
+    home_pmf = poisson_pmf_row(home_xg, max_goals)
+    away_pmf = poisson_pmf_row(away_xg, max_goals)
 
-    # Iterate over all possible goal combinations
-    for home_goals in range(max_goals):
-        for away_goals in range(max_goals):
-            prob = poisson.pmf(home_goals, home_xg) * poisson.pmf(away_goals, away_xg)
-            goal_matrix[home_goals, away_goals] = prob
-            if home_goals > away_goals:
-                home_win_prob += prob
-            elif home_goals == away_goals:
-                draw_prob += prob
-            else:
-                away_win_prob += prob
+    # Matrix to store goal probabilities of all possible goal combinations
+    goal_matrix = np.outer(home_pmf, away_pmf)
+
+    # Home wins below the diagonal, draws on the diagonal and away wins above it
+    home_win_prob = np.sum(np.tril(goal_matrix, k=-1))
+    draw_prob = np.trace(goal_matrix)
+    away_win_prob = np.sum(np.triu(goal_matrix, k=1))
 
     # Normalize the goal matrix so the probabilities sum to 1
     goal_matrix /= np.sum(goal_matrix)
 
     return home_win_prob, draw_prob, away_win_prob, goal_matrix
 
+# Function to calculate Poisson outcome probabilities for many matches at once
+def calculate_match_outcome_probabilities_batch(home_xg, away_xg, max_goals=6):
+    # PMF tables of shape (n_matches, max_goals) for home and away goals
+    home_pmf = poisson_pmf_table(home_xg, max_goals)
+    away_pmf = poisson_pmf_table(away_xg, max_goals)
+
+    # Outer product per match gives the (n_matches, max_goals, max_goals) goal matrices
+    goal_matrices = home_pmf[:, :, np.newaxis] * away_pmf[:, np.newaxis, :]
+
+    # Outcome probabilities from the lower triangle, diagonal and upper triangle
+    home_win_prob = np.sum(np.tril(goal_matrices, k=-1), axis=(1, 2))
+    draw_prob = np.trace(goal_matrices, axis1=1, axis2=2)
+    away_win_prob = np.sum(np.triu(goal_matrices, k=1), axis=(1, 2))
+
+    # Normalize each goal matrix so the probabilities sum to 1
+    goal_matrices /= np.sum(goal_matrices, axis=(1, 2), keepdims=True)
+
+    return home_win_prob, draw_prob, away_win_prob, goal_matrices
+
 # Function to suggest possible results based on goal matrix and predictions
 def suggest_possible_results(goal_matrix, predicted_home_goals, predicted_away_goals, max_goals=6):
     possible_results = []
@@ -70,20 +139,113 @@ def suggest_possible_results(goal_matrix, predicted_home_goals, predicted_away_g
 
     return [(home_goals, away_goals, round(prob * 100, 2)) for home_goals, away_goals, prob, _ in top_3_results]
 
-# Main function to predict match and suggest possible results
-def predict_match_with_suggestions(team_stats, home_team, away_team, max_goals=6):
-    # Predict the match result
-    predicted_home_goals, predicted_away_goals = predict_match_result(team_stats, home_team, away_team, max_goals)
+# Function to select the top-k results of each goal matrix, sorted like suggest_possible_results
+def suggest_possible_results_batch(goal_matrices, predicted_home_goals, predicted_away_goals, max_goals=6, top_k=3):
+    n_fixtures = goal_matrices.shape[0]
+    home_goals, away_goals = np.divmod(np.arange(max_goals * max_goals), max_goals)
 
-    # Calculate goal probabilities
-    home_stats = team_stats.loc[team_stats['Team'] == home_team].iloc[0]
-    away_stats = team_stats.loc[team_stats['Team'] == away_team].iloc[0]
-    home_xg = ((home_stats['xG_Scored'] / home_stats['Matches'] + away_stats['xG_Conceded'] / away_stats['Matches'])*0.5 + (home_stats['GF'] / home_stats['Matches'] + away_stats['GA'] / away_stats['Matches'])*0.5 - 1)*1.12
-    away_xg = ((away_stats['xG_Scored'] / away_stats['Matches'] + home_stats['xG_Conceded'] / home_stats['Matches'])*0.5 + (away_stats['GF'] / away_stats['Matches'] + home_stats['GA'] / home_stats['Matches'])*0.5 - 1)*0.93
-    # Recalculate the goal matrix with customized xG values
+    # Flatten each matrix row-major, matching the iteration order of the scalar version
+    probabilities = goal_matrices.reshape(n_fixtures, max_goals * max_goals)
+    distances = (
+        np.abs(np.asarray(predicted_home_goals)[:, np.newaxis] - home_goals)
+        + np.abs(np.asarray(predicted_away_goals)[:, np.newaxis] - away_goals)
+    )
+
+    # Stable sort by probability (descending) then distance (ascending)
+    order = np.lexsort((distances, -probabilities), axis=-1)[:, :top_k]
+    top_probabilities = np.take_along_axis(probabilities, order, axis=-1)
+
+    return [
+        [(int(home_goals[cell]), int(away_goals[cell]), round(float(prob) * 100, 2)) for cell, prob in zip(cells, probs)]
+        for cells, probs in zip(order, top_probabilities)
+    ]
+
+# Main function to predict match and suggest possible results
+# (with ratings, a TeamRatings fitted by ratings.fit_ratings gives the match xG instead of the team_stats formula)
+def predict_match_with_suggestions(team_stats, home_team, away_team, max_goals=6, ratings=None, team_index=None):
+    if ratings is not None:
+        if team_index is not None:
+            home_team, away_team = _ratings_team_names(ratings, [home_team, away_team], team_index)
+        home_xg, away_xg = ratings.expected_goals(home_team, away_team)
+    else:
+        # Look up both teams once and calculate the match xG
+        team_rows = build_team_rows(team_stats, team_index)
+        home_stats = find_team_stats(team_stats, home_team, team_index, team_rows)
+        away_stats = find_team_stats(team_stats, away_team, team_index, team_rows)
+        home_xg, away_xg = calculate_match_xg(home_stats, away_stats)
+
+    # Calculate goal probabilities and predict the match result from the same goal matrix
     _, _, _, goal_matrix = calculate_match_outcome_probabilities(home_xg, away_xg, max_goals)
+    predicted_home_goals, predicted_away_goals = calculate_predicted_goals(goal_matrix, max_goals)
 
     # Suggest 3 possible results
     suggestions = suggest_possible_results(goal_matrix, predicted_home_goals, predicted_away_goals, max_goals)
 
-    return predicted_home_goals, predicted_away_goals, suggestions
\ No newline at end of file
+    return predicted_home_goals, predicted_away_goals, suggestions
+
+# Function to calculate the xG pair of every fixture of a fixture list as arrays
+def calculate_fixture_xg(team_stats, fixtures_df, team_index=None, team_rows=None):
+    if team_rows is None:
+        team_rows = build_team_rows(team_stats, team_index)
+
+    # Look up every team of the fixture list once, and make sure it exists in the team_stats DataFrame
+    rows = {team: _team_row(team, team_rows, team_index) for team in set(fixtures_df['HomeTeam']).union(fixtures_df['AwayTeam'])}
+    missing_teams = sorted(str(team) for team, row in rows.items() if row is None)
+    if missing_teams:
+        raise KeyError(_missing_teams_message(missing_teams, team_stats['Team']))
+
+    home_rows = np.array([rows[team] for team in fixtures_df['HomeTeam']], dtype=int)
+    away_rows = np.array([rows[team] for team in fixtures_df['AwayTeam']], dtype=int)
+    stats = {column: team_stats[column].to_numpy(dtype=float) for column in ['Matches', 'GF', 'GA', 'xG_Scored', 'xG_Conceded']}
+    home_stats = {column: values[home_rows] for column, values in stats.items()}
+    away_stats = {column: values[away_rows] for column, values in stats.items()}
+    return calculate_match_xg(home_stats, away_stats)
+
+# Function to predict every fixture of a fixture list in one batch
+def predict_fixtures(team_stats, fixtures_df, max_goals=6, top_k=3, ratings=None, team_index=None):
+    """
+    Predict all fixtures at once. Team rows are looked up once per team and the xG pairs,
+    goal matrices, predicted goals and suggestions are computed as arrays.
+
+    Parameters:
+    - team_stats (DataFrame): The team statistics DataFrame produced by aggregate_team_stats.
+    - fixtures_df (DataFrame): Fixtures with 'HomeTeam' and 'AwayTeam' columns.
+    - max_goals (int): Number of goals per team covered by the goal matrices.
+    - top_k (int): Number of most likely results to suggest per fixture.
+    - ratings (TeamRatings): Fitted ratings (ratings.fit_ratings) used for the xG pairs instead
+      of the team_stats formula.
+    - team_index (TeamIndex): Team index (teams.TeamIndex) used to match other spellings of
+      the fixture team names, in team_stats as well as in the ratings.
+
+    Returns:
+    - predictions (DataFrame): One row per fixture with xG, predicted goals, H/D/A probabilities
+      and the top-k suggested results.
+    - goal_matrices (ndarray): Stacked (n_fixtures, max_goals, max_goals) probability tensor.
+    """
+    if ratings is not None:
+        home_teams, away_teams = fixtures_df['HomeTeam'], fixtures_df['AwayTeam']
+        if team_index is not None:
+            home_teams = _ratings_team_names(ratings, home_teams, team_index)
+            away_teams = _ratings_team_names(ratings, away_teams, team_index)
+        home_xg, away_xg = ratings.expected_goals(home_teams, away_teams)
+    else:
+        home_xg, away_xg = calculate_fixture_xg(team_stats, fixtures_df, team_index)
+
+    home_win_prob, draw_prob, away_win_prob, goal_matrices = calculate_match_outcome_probabilities_batch(home_xg, away_xg, max_goals)
+    predicted_home_goals, predicted_away_goals = calculate_predicted_goals(goal_matrices, max_goals)
+    suggestions = suggest_possible_results_batch(goal_matrices, predicted_home_goals, predicted_away_goals, max_goals, top_k)
+
+    predictions = pd.DataFrame({
+        'HomeTeam': fixtures_df['HomeTeam'].to_numpy(),
+        'AwayTeam': fixtures_df['AwayTeam'].to_numpy(),
+        'Home_xG': home_xg,
+        'Away_xG': away_xg,
+        'PredictedHomeGoals': predicted_home_goals,
+        'PredictedAwayGoals': predicted_away_goals,
+        'HomeWinProb': home_win_prob,
+        'DrawProb': draw_prob,
+        'AwayWinProb': away_win_prob,
+        'Suggestions': suggestions,
+    }, index=fixtures_df.index)
+
+    return predictions, goal_matrices
@@ -0,0 +1,121 @@
+import time
+from functools import lru_cache
+import numpy as np
+
+# Number of distinct (lambda, max_goals) pairs kept by the scalar PMF cache
+PMF_CACHE_SIZE = 65536
+
+
+# Function to calculate the Poisson PMF of 0..max_goals-1 goals for every lambda of an array.
+# The table is built with the recurrence p(0) = exp(-lambda), p(k) = p(k-1) * lambda / k.
+def _calculate_pmf_table(lambdas, max_goals):
+    table = np.empty(lambdas.shape + (max_goals,))
+    table[..., 0] = np.exp(-lambdas)
+    table[..., 1:] = lambdas[..., np.newaxis] / np.arange(1, max_goals)
+    np.cumprod(table, axis=-1, out=table)
+
+    # Negative lambdas have no Poisson distribution, like scipy.stats.poisson
+    table[lambdas < 0] = np.nan
+    return table
+
+
+def poisson_pmf_table(lambdas, max_goals=6, cache=True, decimals=None):
+    """
+    Calculate the Poisson probabilities of 0..max_goals-1 goals for an array of lambdas.
+
+    Parameters:
+    - lambdas (array): Expected goals, of any shape.
+    - max_goals (int): Number of goal counts in the table.
+    - cache (bool): Calculate each distinct lambda only once. xG values built from integer
+      shot and corner counts repeat a lot, so this usually shrinks the work considerably.
+    - decimals (int): Optionally round (quantize) the lambdas first, which trades exactness
+      for even more repeated values.
+
+    Returns:
+    - table (ndarray): Array of shape lambdas.shape + (max_goals,).
+    """
+    lambdas = np.asarray(lambdas, dtype=float)
+    if decimals is not None:
+        lambdas = np.round(lambdas, decimals)
+
+    if not cache:
+        return _calculate_pmf_table(lambdas, max_goals)
+
+    unique_lambdas, inverse = np.unique(lambdas, return_inverse=True)
+    return _calculate_pmf_table(unique_lambdas, max_goals)[inverse.reshape(lambdas.shape)]
+
+
+# Scalar version of poisson_pmf_table with an LRU cache, for code paths that score one match at a time
+@lru_cache(maxsize=PMF_CACHE_SIZE)
+def _cached_pmf_row(lam, max_goals):
+    row = _calculate_pmf_table(np.array(lam, dtype=float), max_goals)
+    row.setflags(write=False)
+    return row
+
+
+def poisson_pmf_row(lam, max_goals=6, decimals=None):
+    lam = float(lam)
+    if decimals is not None:
+        lam = round(lam, decimals)
+    return _cached_pmf_row(lam, max_goals)
+
+
+# Function to calculate the Poisson CDF P(X <= k) for arrays of k and lambdas (k is floored like scipy)
+def poisson_cdf(k, lambdas):
+    # scipy is only imported when a CDF is needed, which keeps the prediction stack light
+    from scipy.special import gammaincc
+
+    k = np.floor(np.asarray(k, dtype=float))
+    lambdas = np.asarray(lambdas, dtype=float)
+
+    # P(X <= k) is the regularized upper incomplete gamma function Q(k + 1, lambda)
+    with np.errstate(invalid='ignore'):
+        cdf = np.where(k < 0, 0.0, gammaincc(np.maximum(k, 0) + 1, lambdas))
+    return np.where((lambdas < 0) | np.isnan(lambdas) | np.isnan(k), np.nan, cdf)
+
+
+# Micro-benchmark of the kernel against the scipy.stats code path it replaces
+def benchmark_kernel(n_matches=100000, max_goals=6, seed=0):
+    from scipy.stats import poisson
+
+    # xG values as produced by calculate_xg from integer shot and corner counts
+    rng = np.random.default_rng(seed)
+    lambdas = rng.poisson(12, n_matches) * 0.11 + rng.poisson(5, n_matches) * 0.02
+    goals = np.arange(max_goals)
+    results = {}
+
+    start_time = time.perf_counter()
+    for lam in lambdas[:1000]:
+        [poisson.pmf(k, lam) for k in goals]
+    results['scipy_scalar_per_match'] = (time.perf_counter() - start_time) / 1000 * n_matches
+
+    start_time = time.perf_counter()
+    reference = poisson.pmf(goals[np.newaxis, :], lambdas[:, np.newaxis])
+    results['scipy_vectorized'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    table = poisson_pmf_table(lambdas, max_goals, cache=False)
+    results['kernel'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    cached_table = poisson_pmf_table(lambdas, max_goals, cache=True)
+    results['kernel_cached'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    reference_cdf = poisson.cdf(lambdas - 1, lambdas[::-1])
+    results['scipy_cdf'] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    cdf = poisson_cdf(lambdas - 1, lambdas[::-1])
+    results['kernel_cdf'] = time.perf_counter() - start_time
+
+    max_error = max(np.abs(table - reference).max(), np.abs(cached_table - reference).max(), np.abs(cdf - reference_cdf).max())
+    return results, max_error
+
+
+if __name__ == "__main__":
+    timings, max_error = benchmark_kernel()
+    print("=== Poisson kernel micro-benchmark (100000 matches) ===")
+    for name, seconds in timings.items():
+        print(f"{name:>24}: {seconds * 1000:10.2f} ms")
+    print(f"Maximum absolute difference to scipy.stats: {max_error:.2e}")
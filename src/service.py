@@ -0,0 +1,337 @@
+import os
+import re
+import glob
+import json
+import asyncio
+import argparse
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+import pandas as pd
+from predict import (build_team_rows, calculate_match_xg, calculate_match_outcome_probabilities,
+                     calculate_match_outcome_probabilities_batch, calculate_predicted_goals, suggest_possible_results,
+                     suggest_possible_results_batch)
+
+# Team statistics columns used by the prediction model
+MODEL_COLUMNS = ['Matches', 'GF', 'GA', 'xG_Scored', 'xG_Conceded']
+
+# Saved team stats: '<season folder>_parquet/processed_data/<league>.parquet', e.g. '24_25_parquet/processed_data/I1.parquet'
+TEAM_STATS_PATTERN = re.compile(r'(\d{2})_(\d{2})_parquet$')
+
+# Number of responses kept by the response cache
+RESPONSE_CACHE_SIZE = 100000
+
+# Largest accepted max_goals: every fixture allocates a max_goals x max_goals goal matrix
+MAX_GOALS_LIMIT = 20
+
+
+class TeamStatsTable:
+    # Array-backed team statistics of one league and season, with O(1) team lookups
+    def __init__(self, team_stats):
+        self.teams = team_stats['Team'].astype(str).tolist()
+        self.team_ids, _ = build_team_rows(team_stats)
+        self.stats = {column: team_stats[column].to_numpy(dtype=float) for column in MODEL_COLUMNS}
+
+    def team_id(self, team):
+        try:
+            return self.team_ids[team]
+        except KeyError:
+            raise KeyError(f"Unknown team: {team}")
+
+    def match_xg(self, home_ids, away_ids):
+        home_stats = {column: values[home_ids] for column, values in self.stats.items()}
+        away_stats = {column: values[away_ids] for column, values in self.stats.items()}
+        return calculate_match_xg(home_stats, away_stats)
+
+
+class TeamStatsIndex:
+    """
+    In-memory index of the saved team stats tables, keyed by (league, season).
+
+    scan() loads new and modified Parquet files (by modification time) and drops deleted
+    ones, so calling it periodically hot-reloads the index. Predictions are answered from
+    the array-backed tables and kept in an LRU response cache keyed by
+    (league, season, home, away, max_goals), which is cleared whenever a table changes.
+    """
+
+    def __init__(self, root_folder='.', cache_size=RESPONSE_CACHE_SIZE):
+        self.root_folder = root_folder
+        self.cache_size = cache_size
+        self.tables = {}
+        self.modified_times = {}
+        self.cache = OrderedDict()
+
+    def _table_files(self):
+        files = {}
+        for path in glob.glob(os.path.join(self.root_folder, '*_parquet', 'processed_data', '*.parquet')):
+            name = os.path.basename(path)[:-len('.parquet')]
+            match = TEAM_STATS_PATTERN.search(os.path.basename(os.path.dirname(os.path.dirname(path))))
+            # Skip the match history and team totals files saved next to the team stats
+            if match and not name.endswith(('_matches', '_totals')):
+                files[(name, match.group(1) + match.group(2))] = path
+        return files
+
+    def load_changes(self):
+        # Read the new and modified tables without changing the index, so it can run in a worker thread.
+        # Returns {key: (table, modified time)} and the keys of the removed tables.
+        files = self._table_files()
+        loaded = {}
+        for key, path in files.items():
+            modified_time = os.path.getmtime(path)
+            if self.modified_times.get(key) != modified_time:
+                loaded[key] = (TeamStatsTable(pd.read_parquet(path, columns=['Team'] + MODEL_COLUMNS)), modified_time)
+        removed = [key for key in self.tables if key not in files]
+        return loaded, removed
+
+    def apply_changes(self, loaded, removed):
+        # Swap the tables read by load_changes into the index, returns the changed (league, season) keys
+        for key, (table, modified_time) in loaded.items():
+            self.tables[key] = table
+            self.modified_times[key] = modified_time
+        for key in removed:
+            self.tables.pop(key, None)
+            self.modified_times.pop(key, None)
+
+        changed = list(loaded) + list(removed)
+        if changed:
+            self.cache.clear()
+        return changed
+
+    def scan(self):
+        # Returns the (league, season) keys that were loaded, reloaded or removed
+        return self.apply_changes(*self.load_changes())
+
+    def table(self, league, season):
+        try:
+            return self.tables[(league, season)]
+        except KeyError:
+            raise KeyError(f"No team stats for league {league} and season {season}")
+
+    def predict(self, league, season, home_team, away_team, max_goals=6):
+        key = (league, season, home_team, away_team, max_goals)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        table = self.table(league, season)
+        home_xg, away_xg = table.match_xg(table.team_id(home_team), table.team_id(away_team))
+        home_win_prob, draw_prob, away_win_prob, goal_matrix = calculate_match_outcome_probabilities(home_xg, away_xg, max_goals)
+        predicted_home_goals, predicted_away_goals = calculate_predicted_goals(goal_matrix, max_goals)
+        suggestions = suggest_possible_results(goal_matrix, predicted_home_goals, predicted_away_goals, max_goals)
+
+        response = {
+            'league': league, 'season': season, 'home': home_team, 'away': away_team,
+            'home_xg': float(home_xg), 'away_xg': float(away_xg),
+            'predicted_home_goals': float(predicted_home_goals), 'predicted_away_goals': float(predicted_away_goals),
+            'home_win_prob': float(home_win_prob), 'draw_prob': float(draw_prob), 'away_win_prob': float(away_win_prob),
+            'suggestions': [[int(home), int(away), float(prob)] for home, away, prob in suggestions],
+        }
+
+        self.cache[key] = response
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return response
+
+    def predict_batch(self, league, season, fixtures, max_goals=6, top_k=3):
+        # Predict a list of (home, away) fixtures of one league and season with the array code path
+        table = self.table(league, season)
+        home_ids = np.array([table.team_id(home) for home, _ in fixtures], dtype=int)
+        away_ids = np.array([table.team_id(away) for _, away in fixtures], dtype=int)
+
+        home_xg, away_xg = table.match_xg(home_ids, away_ids)
+        home_win_prob, draw_prob, away_win_prob, goal_matrices = calculate_match_outcome_probabilities_batch(home_xg, away_xg, max_goals)
+        predicted_home_goals, predicted_away_goals = calculate_predicted_goals(goal_matrices, max_goals)
+        suggestions = suggest_possible_results_batch(goal_matrices, predicted_home_goals, predicted_away_goals, max_goals, top_k)
+
+        return [
+            {
+                'home': home, 'away': away, 'home_xg': float(home_xg[i]), 'away_xg': float(away_xg[i]),
+                'predicted_home_goals': float(predicted_home_goals[i]), 'predicted_away_goals': float(predicted_away_goals[i]),
+                'home_win_prob': float(home_win_prob[i]), 'draw_prob': float(draw_prob[i]), 'away_win_prob': float(away_win_prob[i]),
+                'suggestions': [list(suggestion) for suggestion in suggestions[i]],
+            }
+            for i, (home, away) in enumerate(fixtures)
+        ]
+
+
+# Function to replace NaN and infinite floats (e.g. stats of a team without matches) by None
+def _replace_non_finite(value):
+    if isinstance(value, dict):
+        return {key: _replace_non_finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_replace_non_finite(item) for item in value]
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+# Function to serialize a response as strict JSON: NaN is not valid JSON, so it is sent as null
+def encode_json(payload):
+    try:
+        return json.dumps(payload, allow_nan=False).encode('utf-8')
+    except ValueError:
+        return json.dumps(_replace_non_finite(payload), allow_nan=False).encode('utf-8')
+
+
+# Function to read an integer request parameter in [low, high], raises ValueError (400) otherwise
+def _bounded_int(value, name, low, high):
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an integer")
+    if not low <= number <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return number
+
+
+# Function to validate the body of a batch request, returns the fixtures, max_goals and top_k
+def _parse_batch_request(request):
+    if not isinstance(request, dict):
+        raise ValueError("The request body must be a JSON object")
+    missing = [name for name in ('league', 'season', 'fixtures') if name not in request]
+    if missing:
+        raise ValueError(f"Missing parameters: {', '.join(missing)}")
+    fixtures = request['fixtures']
+    if not isinstance(fixtures, list) or not fixtures:
+        raise ValueError("fixtures must be a non-empty list of [home, away] pairs")
+    if any(not isinstance(fixture, list) or len(fixture) != 2 for fixture in fixtures):
+        raise ValueError("Every fixture must be a [home, away] pair")
+
+    max_goals = _bounded_int(request.get('max_goals', 6), 'max_goals', 1, MAX_GOALS_LIMIT)
+    top_k = _bounded_int(request.get('top_k', 3), 'top_k', 1, max_goals * max_goals)
+    return [tuple(fixture) for fixture in fixtures], max_goals, top_k
+
+
+# HTTP status lines of the responses used by the service
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class PredictionService:
+    """
+    Minimal asyncio HTTP/1.1 server (with keep-alive) answering predictions from a TeamStatsIndex.
+
+    Endpoints:
+    - GET /health
+    - GET /tables: the loaded (league, season) tables and their teams
+    - GET /predict?league=I1&season=2425&home=Inter&away=Milan&max_goals=6
+    - POST /predict/batch with {"league": "I1", "season": "2425", "fixtures": [["Inter", "Milan"], ...], "max_goals": 6}
+    """
+
+    def __init__(self, index, reload_interval=5.0):
+        self.index = index
+        self.reload_interval = reload_interval
+
+    async def _reload_periodically(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                # The Parquet files are read in a worker thread, so requests are not blocked during a reload;
+                # the tables are swapped in on the event loop
+                loaded, removed = await loop.run_in_executor(None, self.index.load_changes)
+                changed = self.index.apply_changes(loaded, removed)
+            except Exception as e:
+                print(f"Reload failed: {e}")
+                continue
+            if changed:
+                print(f"Reloaded team stats: {', '.join(f'{league} {season}' for league, season in changed)}")
+
+    def handle(self, method, target, body):
+        # Returns the status code and JSON payload of a request.
+        # Invalid parameters are checked before any work and raise ValueError (400).
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if url.path == '/health':
+            return 200, {'status': 'ok', 'tables': len(self.index.tables)}
+
+        if url.path == '/tables':
+            return 200, [
+                {'league': league, 'season': season, 'teams': table.teams}
+                for (league, season), table in sorted(self.index.tables.items())
+            ]
+
+        if url.path == '/predict':
+            if method != 'GET':
+                return 405, {'error': 'Use GET'}
+            missing = [name for name in ('league', 'season', 'home', 'away') if name not in query]
+            if missing:
+                return 400, {'error': f"Missing parameters: {', '.join(missing)}"}
+            max_goals = _bounded_int(query.get('max_goals', 6), 'max_goals', 1, MAX_GOALS_LIMIT)
+            return 200, self.index.predict(query['league'], query['season'], query['home'], query['away'], max_goals)
+
+        if url.path == '/predict/batch':
+            if method != 'POST':
+                return 405, {'error': 'Use POST'}
+            request = json.loads(body or b'{}')
+            fixtures, max_goals, top_k = _parse_batch_request(request)
+            return 200, self.index.predict_batch(request['league'], request['season'], fixtures, max_goals, top_k)
+
+        return 404, {'error': f"Unknown path: {url.path}"}
+
+    def respond(self, method, target, body):
+        # Returns the status code and JSON payload of a request, with errors mapped to their status
+        try:
+            return self.handle(method, target, body)
+        except KeyError as e:
+            return 404, {'error': str(e.args[0]) if e.args else str(e)}
+        except (ValueError, TypeError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f"{type(e).__name__}: {e}"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = self.respond(method, target, body)
+                content = encode_json(payload)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(
+                    f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(content)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode('latin-1') + content
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        reload_task = asyncio.create_task(self._reload_periodically())
+        print(f"Serving predictions for {len(self.index.tables)} tables on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            reload_task.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve match predictions from the saved team stats.")
+    parser.add_argument('--root', type=str, default='.', help="Folder containing the '<season>_parquet' folders.")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help="Host to listen on.")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on.")
+    parser.add_argument('--reload-interval', type=float, default=5.0, help="Seconds between checks for new Parquet files.")
+    args = parser.parse_args()
+
+    team_stats_index = TeamStatsIndex(args.root)
+    team_stats_index.scan()
+    asyncio.run(PredictionService(team_stats_index, args.reload_interval).serve(args.host, args.port))
@@ -0,0 +1,167 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from probability import poisson_pmf_table
+from predict import calculate_fixture_xg
+
+# Number of simulated seasons drawn per batch (bounds the memory of the (batch, fixtures) arrays)
+SIMULATION_CHUNK_SIZE = 10000
+
+# Number of simulated seasons drawn from one random stream. Chunks hold whole blocks, so every
+# season gets the same random numbers whatever the chunk size and number of workers.
+SIMULATION_BLOCK_SIZE = 1000
+
+
+# Function to list the fixtures of a double round-robin that have not been played yet
+def remaining_fixtures(teams, played_df):
+    teams = list(teams)
+    played = set(zip(played_df['HomeTeam'], played_df['AwayTeam']))
+    fixtures = [(home, away) for home in teams for away in teams if home != away and (home, away) not in played]
+    return pd.DataFrame(fixtures, columns=['HomeTeam', 'AwayTeam'])
+
+
+# Function to calculate the cumulative goal distributions of the fixtures, truncated at max_goals - 1 goals
+# and renormalized like the goal matrices of predict_match_result
+def _goal_cdfs(xg, max_goals):
+    # Negative xG from the hand-tuned formula would have no Poisson distribution, it counts as 0 goals
+    pmf = poisson_pmf_table(np.maximum(xg, 0), max_goals)
+    cdf = np.cumsum(pmf, axis=-1)
+    return cdf / cdf[:, -1:]
+
+
+# Function to draw goals from cumulative distributions of shape (n_fixtures, max_goals) by inversion
+def _draw_goals(rng, cdf, n_simulations):
+    uniforms = rng.random((n_simulations, cdf.shape[0]))
+    return (uniforms[:, :, np.newaxis] >= cdf[np.newaxis, :, :-1]).sum(axis=-1, dtype=np.int16)
+
+
+def _simulate_chunk(home_cdf, away_cdf, home_ids, away_ids, points, gf, ga, blocks):
+    """
+    Simulate the seasons of the (n_simulations, seed_sequence) blocks and return the rank counts
+    (n_teams, n_teams) and the sums of the final points, goal difference and goals scored of every team.
+    """
+    n_teams = len(points)
+    home_goals = []
+    away_goals = []
+    for n_simulations, seed_sequence in blocks:
+        rng = np.random.default_rng(seed_sequence)
+        home_goals.append(_draw_goals(rng, home_cdf, n_simulations))
+        away_goals.append(_draw_goals(rng, away_cdf, n_simulations))
+    home_goals = np.concatenate(home_goals)
+    away_goals = np.concatenate(away_goals)
+
+    # Incidence matrices (n_fixtures, n_teams) map fixture results to the team totals
+    home_incidence = np.zeros((len(home_ids), n_teams))
+    home_incidence[np.arange(len(home_ids)), home_ids] = 1
+    away_incidence = np.zeros((len(away_ids), n_teams))
+    away_incidence[np.arange(len(away_ids)), away_ids] = 1
+
+    home_points = np.where(home_goals > away_goals, 3, np.where(home_goals == away_goals, 1, 0))
+    away_points = np.where(home_goals < away_goals, 3, np.where(home_goals == away_goals, 1, 0))
+    final_points = points + home_points @ home_incidence + away_points @ away_incidence
+    final_gf = gf + home_goals @ home_incidence + away_goals @ away_incidence
+    final_ga = ga + away_goals @ home_incidence + home_goals @ away_incidence
+    final_gd = final_gf - final_ga
+
+    # Rank by Points, GD and GF like aggregate_team_stats, remaining ties keep the team_stats order
+    order = np.lexsort((-final_gf, -final_gd, -final_points), axis=-1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(n_teams)[np.newaxis, :], axis=-1)
+
+    rank_counts = np.bincount(
+        (np.arange(n_teams)[np.newaxis, :] * n_teams + ranks).ravel(), minlength=n_teams * n_teams
+    ).reshape(n_teams, n_teams)
+    return rank_counts, final_points.sum(axis=0), final_gd.sum(axis=0), final_gf.sum(axis=0)
+
+
+def simulate_season(team_stats, fixtures_df, n_simulations=100000, relegation_spots=3, max_goals=6, seed=0,
+                    workers=1, chunk_size=SIMULATION_CHUNK_SIZE):
+    """
+    Simulate the rest of a season with the Poisson xG model of predict_match_result.
+
+    Every remaining fixture is priced once with the xG pair of the current team statistics,
+    then all simulated seasons are drawn as (simulations, fixtures) arrays in chunks of
+    chunk_size. Every block of SIMULATION_BLOCK_SIZE seasons has its own seed spawned from
+    seed, and chunks hold whole blocks, so the results only depend on seed, not on the
+    chunk size or the number of worker processes.
+
+    Parameters:
+    - team_stats (DataFrame): The current table produced by aggregate_team_stats.
+    - fixtures_df (DataFrame): Remaining fixtures with 'HomeTeam' and 'AwayTeam' columns.
+    - n_simulations (int): Number of simulated seasons.
+    - relegation_spots (int): Number of relegated teams at the bottom of the table.
+    - max_goals (int): Number of goals per team covered by the goal distributions.
+    - seed (int): Seed of the random generators.
+    - workers (int): Number of worker processes the chunks are shared across.
+    - chunk_size (int): Number of seasons simulated per chunk, rounded up to whole blocks.
+
+    Returns:
+    - summary (DataFrame): Per team: current and expected points, expected GD and GF,
+      expected rank, title and relegation probabilities, sorted by expected points.
+    - rank_distribution (DataFrame): Probability of every final rank (columns 1..n_teams) per team.
+    """
+    teams = team_stats['Team'].tolist()
+    team_ids = {team: i for i, team in enumerate(teams)}
+    home_xg, away_xg = calculate_fixture_xg(team_stats, fixtures_df)
+
+    arguments = (
+        _goal_cdfs(np.atleast_1d(home_xg), max_goals), _goal_cdfs(np.atleast_1d(away_xg), max_goals),
+        fixtures_df['HomeTeam'].map(team_ids).to_numpy(dtype=int), fixtures_df['AwayTeam'].map(team_ids).to_numpy(dtype=int),
+        team_stats['Points'].to_numpy(dtype=float), team_stats['GF'].to_numpy(dtype=float), team_stats['GA'].to_numpy(dtype=float),
+    )
+    block_sizes = [min(SIMULATION_BLOCK_SIZE, n_simulations - start) for start in range(0, n_simulations, SIMULATION_BLOCK_SIZE)]
+    blocks = list(zip(block_sizes, np.random.SeedSequence(seed).spawn(len(block_sizes))))
+    blocks_per_chunk = max(1, -(-chunk_size // SIMULATION_BLOCK_SIZE))
+    chunks = [blocks[start:start + blocks_per_chunk] for start in range(0, len(blocks), blocks_per_chunk)]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_simulate_chunk, *arguments, chunk) for chunk in chunks]
+            results = [future.result() for future in futures]
+    else:
+        results = [_simulate_chunk(*arguments, chunk) for chunk in chunks]
+
+    rank_counts, points_sum, gd_sum, gf_sum = (sum(values) for values in zip(*results))
+    rank_probabilities = rank_counts / n_simulations
+    n_teams = len(teams)
+
+    summary = pd.DataFrame({
+        'Team': teams,
+        'Points': team_stats['Points'].to_numpy(),
+        'ExpectedPoints': points_sum / n_simulations,
+        'ExpectedGD': gd_sum / n_simulations,
+        'ExpectedGF': gf_sum / n_simulations,
+        'ExpectedRank': rank_probabilities @ np.arange(1, n_teams + 1),
+        'TitleProb': rank_probabilities[:, 0],
+        'RelegationProb': rank_probabilities[:, n_teams - relegation_spots:].sum(axis=1),
+    })
+    summary = summary.sort_values(by=['ExpectedPoints', 'ExpectedGD', 'ExpectedGF'], ascending=[False, False, False], ignore_index=True)
+
+    rank_distribution = pd.DataFrame(rank_probabilities, index=pd.Index(teams, name='Team'), columns=range(1, n_teams + 1))
+    return summary, rank_distribution.loc[summary['Team']]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate the rest of a season from the saved team stats.")
+    parser.add_argument('--season', type=str, required=True, help="The season to simulate (e.g., '2425').")
+    parser.add_argument('--file', type=str, required=True, help="League file of the season (e.g., 'I1').")
+    parser.add_argument('--simulations', type=int, default=100000, help="Number of simulated seasons.")
+    parser.add_argument('--relegation-spots', type=int, default=3, help="Number of relegated teams.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Number of worker processes.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    # Current table and played matches saved by main_script.py
+    processed_folder = os.path.join(f"{args.season[:2]}_{args.season[2:]}_parquet", 'processed_data')
+    team_stats = pd.read_parquet(os.path.join(processed_folder, f"{args.file}.parquet"))
+    played_df = pd.read_parquet(os.path.join(processed_folder, f"{args.file}_matches.parquet"), columns=['HomeTeam', 'AwayTeam'])
+    fixtures_df = remaining_fixtures(team_stats['Team'], played_df)
+
+    start_time = time.perf_counter()
+    summary, _ = simulate_season(team_stats, fixtures_df, args.simulations, args.relegation_spots, seed=args.seed, workers=args.workers)
+    print(f"=== {args.file} {args.season}: {len(fixtures_df)} remaining fixtures, {args.simulations} simulations "
+          f"in {time.perf_counter() - start_time:.1f} s ===")
+    print(summary.to_string(index=False, float_format=lambda value: f"{value:.3f}"))
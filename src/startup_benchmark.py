@@ -0,0 +1,187 @@
+import io
+import os
+import re
+import sys
+import json
+import zipfile
+import hashlib
+import argparse
+import tempfile
+import subprocess
+
+# The budgets and module checks cover import time only: every command is run for real (on a small
+# synthetic season, so the imports done lazily inside the stages are measured too), but the time the
+# stage spends on its work is not part of the measurement.
+
+# Season and league of the synthetic workspace the commands run on
+BENCHMARK_SEASON = '2425'
+BENCHMARK_LEAGUE = 'L1'
+
+# Arguments of each measured main_script.py run: the entry point of every command with --help
+# (argument parsing only), then every subcommand doing its work offline
+COMMAND_RUNS = {
+    'cli': ['--help'],
+    'fetch --help': ['fetch', '--help'],
+    'transform --help': ['transform', '--help'],
+    'predict --help': ['predict', '--help'],
+    'plot --help': ['plot', '--help'],
+    'fetch': ['fetch', '--season', BENCHMARK_SEASON, '--offline'],
+    'transform': ['transform', '--season', BENCHMARK_SEASON, '--file', BENCHMARK_LEAGUE, '--offline'],
+    'predict': ['predict', '--season', BENCHMARK_SEASON, '--file', BENCHMARK_LEAGUE, '--home', '{home}', '--away', '{away}'],
+    'plot': ['plot', '--season', BENCHMARK_SEASON, '--file', BENCHMARK_LEAGUE, '--charts', 'save'],
+}
+
+# Import-time budget of each run in milliseconds (the --help runs share the budget of 'cli')
+IMPORT_BUDGET_MS = {
+    'cli': 100,
+    'fetch': 300,
+    'transform': 1200,
+    'predict': 1200,
+    'plot': 3000,
+}
+
+# Packages a run must not import at all (the --help runs share the list of 'cli').
+# transform and predict may import scipy: pandas and pyarrow load parts of it while the stages run.
+FORBIDDEN_MODULES = {
+    'cli': ['pandas', 'numpy', 'scipy', 'matplotlib', 'seaborn', 'requests'],
+    'fetch': ['pandas', 'numpy', 'scipy', 'matplotlib', 'seaborn'],
+    'transform': ['matplotlib', 'seaborn'],
+    'predict': ['matplotlib', 'seaborn'],
+    'plot': [],
+}
+
+# Line of 'python -X importtime': 'import time: <self us> | <cumulative us> | <indented module name>'
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+MAIN_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main_script.py')
+
+
+# Function to parse the stderr of 'python -X importtime' into {module: cumulative microseconds} of the top-level imports
+# and the set of all imported modules
+def parse_import_times(stderr):
+    top_level = {}
+    imported = set()
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+        _, cumulative, indent, module = match.groups()
+        imported.add(module)
+        if not indent:
+            top_level[module] = top_level.get(module, 0) + int(cumulative)
+    return top_level, imported
+
+
+# Function to build a workspace where every subcommand runs offline: a config.json, and a synthetic
+# season ZIP in the download cache. Returns the config and the (home, away) teams of a fixture.
+def prepare_workspace(folder, seed=0):
+    from synthetic import generate_archive
+    from extract import _cache_blob_path, _save_cache_entry
+
+    with open(os.path.join(os.path.dirname(MAIN_SCRIPT_PATH), 'config.json'), 'r') as config_file:
+        config = json.load(config_file)
+    config.update({
+        'base_url': 'http://127.0.0.1:9/{season_year}/data.zip', 'cache_folder': 'download_cache',
+        'match_store_folder': 'match_store', 'team_index_file': 'team_index.json',
+        'metrics_file': None, 'profile_folder': None, 'trace_memory': False,
+    })
+    with open(os.path.join(folder, 'config.json'), 'w') as config_file:
+        json.dump(config, config_file, indent=2)
+
+    matches = generate_archive(n_teams=20, n_seasons=1, n_leagues=1, seed=seed)[(BENCHMARK_SEASON, BENCHMARK_LEAGUE)]
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        zip_file.writestr(config['file_format'].format(season_year=BENCHMARK_SEASON, file_name=BENCHMARK_LEAGUE),
+                          matches.to_csv(index=False))
+    archive_hash = hashlib.sha256(archive.getvalue()).hexdigest()
+
+    cache_folder = os.path.join(folder, config['cache_folder'])
+    blob_path = _cache_blob_path(cache_folder, archive_hash)
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    with open(blob_path, 'wb') as blob_file:
+        blob_file.write(archive.getvalue())
+    url = config['base_url'].format(season_year=BENCHMARK_SEASON)
+    _save_cache_entry(cache_folder, url, {'url': url, 'etag': None, 'last_modified': None, 'sha256': archive_hash})
+
+    return config, (matches['HomeTeam'].iloc[0], matches['AwayTeam'].iloc[0])
+
+
+# Function to run main_script.py with -X importtime in a fresh interpreter and measure its import time
+def measure_command(arguments, cwd):
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', MAIN_SCRIPT_PATH] + arguments,
+        cwd=cwd, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"main_script.py {' '.join(arguments)} failed:\n{completed.stdout[-2000:]}")
+    top_level, imported = parse_import_times(completed.stderr)
+    return sum(top_level.values()) / 1000, imported
+
+
+def run_startup_benchmark(commands=None, repeat=5):
+    """
+    Run every command in fresh interpreters and measure its import time.
+
+    Each command is run repeat times and the fastest run is kept, because the first
+    runs also pay for cold file caches. The commands run in the order of COMMAND_RUNS,
+    so predict and plot read the team stats written by transform.
+
+    Returns:
+    - results (dict): Per command the import time in milliseconds, its budget and the
+      forbidden modules that were imported.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        _, (home_team, away_team) = prepare_workspace(folder)
+        for command, arguments in COMMAND_RUNS.items():
+            if commands and command not in commands:
+                continue
+            arguments = [argument.format(home=home_team, away=away_team) for argument in arguments]
+            budget_name = 'cli' if command.endswith('--help') else command
+
+            times = []
+            imported = set()
+            for _ in range(repeat):
+                milliseconds, run_imported = measure_command(arguments, folder)
+                times.append(milliseconds)
+                imported |= run_imported
+            results[command] = {
+                'milliseconds': min(times),
+                'budget': IMPORT_BUDGET_MS[budget_name],
+                'forbidden': sorted(set(FORBIDDEN_MODULES[budget_name]) & imported),
+            }
+    return results
+
+
+# Function to list the commands over their budget or importing forbidden modules
+def find_violations(results, scale=1.0):
+    violations = []
+    for command, result in results.items():
+        if result['milliseconds'] > result['budget'] * scale:
+            violations.append(f"{command} imports in {result['milliseconds']:.0f} ms, budget {result['budget'] * scale:.0f} ms")
+        if result['forbidden']:
+            violations.append(f"{command} imports {', '.join(result['forbidden'])}")
+    return violations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import time of the main_script.py commands against their budget.")
+    parser.add_argument('--commands', type=str, help=f"Comma separated commands to measure ({', '.join(COMMAND_RUNS)}).")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per command (the fastest is kept).")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply the budgets, e.g. for slower machines.")
+    args = parser.parse_args()
+
+    results = run_startup_benchmark(args.commands.split(',') if args.commands else None, args.repeat)
+
+    print("=== Startup import time ===")
+    print(f"{'Command':<20}{'Time (ms)':>12}{'Budget':>10}")
+    for command, result in results.items():
+        print(f"{command:<20}{result['milliseconds']:>12.1f}{result['budget'] * args.scale:>10.0f}")
+
+    violations = find_violations(results, args.scale)
+    if violations:
+        print("\n!!! STARTUP BUDGET EXCEEDED !!!")
+        for violation in violations:
+            print(f"- {violation}")
+        sys.exit(1)
+    print("\nAll commands within their import-time budget.")
@@ -0,0 +1,161 @@
+import os
+import argparse
+import zipfile
+import numpy as np
+import pandas as pd
+from teams import season_start_year
+
+
+# Function to build a double round-robin schedule (circle method): every team plays once per matchday
+def round_robin_schedule(n_teams, rng):
+    teams = list(rng.permutation(n_teams))
+    if n_teams % 2:
+        teams.append(None)  # Bye
+
+    matchdays = []
+    for _ in range(len(teams) - 1):
+        half = len(teams) // 2
+        pairs = [(teams[i], teams[-1 - i]) for i in range(half)]
+        matchdays.append([(home, away) for home, away in pairs if home is not None and away is not None])
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+
+    # Second half of the season with home and away swapped
+    return matchdays + [[(away, home) for home, away in matchday] for matchday in matchdays]
+
+
+def generate_season(league='I1', season_year='2425', n_teams=20, seed=0):
+    """
+    Generate one synthetic season shaped like a football-data CSV file, with results, match
+    statistics and bookmaker odds driven by random team strengths.
+
+    Parameters:
+    - league (str): League code written to 'Div' and used in the team names.
+    - season_year (str): Season code, e.g. '2425' for 2024-2025.
+    - n_teams (int): Number of teams in the league.
+    - seed (int): Seed of the random generator.
+    """
+    rng = np.random.default_rng(seed)
+    teams = np.array([f"{league} Team {i + 1}" for i in range(n_teams)])
+    attack = rng.normal(0, 0.25, n_teams)
+    defence = rng.normal(0, 0.25, n_teams)
+
+    schedule = round_robin_schedule(n_teams, rng)
+    home_index = np.array([home for matchday in schedule for home, _ in matchday])
+    away_index = np.array([away for matchday in schedule for _, away in matchday])
+    matchday = np.repeat(np.arange(len(schedule)), [len(day) for day in schedule])
+    n_matches = len(home_index)
+
+    # One matchday per week from mid-August of the season's first year (e.g. 1995 for '9596')
+    first_date = pd.Timestamp(year=season_start_year(season_year), month=8, day=15)
+    dates = first_date + pd.to_timedelta(matchday * 7 + rng.integers(0, 3, n_matches), unit='D')
+
+    home_rate = np.exp(0.3 + attack[home_index] - defence[away_index])
+    away_rate = np.exp(0.05 + attack[away_index] - defence[home_index])
+    home_goals = rng.poisson(home_rate)
+    away_goals = rng.poisson(away_rate)
+    home_half_goals = rng.binomial(home_goals, 0.45)
+    away_half_goals = rng.binomial(away_goals, 0.45)
+    home_shots = rng.poisson(9 * home_rate) + home_goals
+    away_shots = rng.poisson(9 * away_rate) + away_goals
+
+    # Bookmaker odds from the true outcome probabilities with a 5% margin
+    goals = np.arange(10)
+    home_pmf = np.exp(-home_rate[:, None]) * home_rate[:, None] ** goals / np.cumprod(np.r_[1, goals[1:]])
+    away_pmf = np.exp(-away_rate[:, None]) * away_rate[:, None] ** goals / np.cumprod(np.r_[1, goals[1:]])
+    matrix = home_pmf[:, :, None] * away_pmf[:, None, :]
+    probabilities = np.stack([
+        np.tril(matrix, -1).sum(axis=(1, 2)), np.trace(matrix, axis1=1, axis2=2), np.triu(matrix, 1).sum(axis=(1, 2))
+    ], axis=1)
+    probabilities /= probabilities.sum(axis=1, keepdims=True)
+    opening_odds = np.round(1 / (probabilities * 1.05 * rng.uniform(0.95, 1.05, probabilities.shape)), 2)
+    closing_odds = np.round(1 / (probabilities * 1.03), 2)
+
+    def result(home, away):
+        return np.where(home > away, 'H', np.where(home < away, 'A', 'D'))
+
+    df = pd.DataFrame({
+        'Div': league,
+        'Date': dates,
+        'Time': rng.choice(['12:30', '15:00', '17:30', '20:00'], n_matches),
+        'HomeTeam': teams[home_index],
+        'AwayTeam': teams[away_index],
+        'FTHG': home_goals,
+        'FTAG': away_goals,
+        'FTR': result(home_goals, away_goals),
+        'HTHG': home_half_goals,
+        'HTAG': away_half_goals,
+        'HTR': result(home_half_goals, away_half_goals),
+        'HS': home_shots,
+        'AS': away_shots,
+        'HST': rng.binomial(home_shots, 0.35),
+        'AST': rng.binomial(away_shots, 0.35),
+        'HF': rng.poisson(12, n_matches),
+        'AF': rng.poisson(12, n_matches),
+        'HC': rng.poisson(5.5, n_matches),
+        'AC': rng.poisson(4.5, n_matches),
+        'HY': rng.poisson(1.8, n_matches),
+        'AY': rng.poisson(2.0, n_matches),
+        'HR': rng.binomial(1, 0.05, n_matches),
+        'AR': rng.binomial(1, 0.06, n_matches),
+        'B365H': opening_odds[:, 0],
+        'B365D': opening_odds[:, 1],
+        'B365A': opening_odds[:, 2],
+        'PSCH': closing_odds[:, 0],
+        'PSCD': closing_odds[:, 1],
+        'PSCA': closing_odds[:, 2],
+    })
+
+    # Sort by kick-off and write dates in the dd/mm/yyyy format of football-data
+    df = df.sort_values(['Date', 'Time'], kind='mergesort', ignore_index=True)
+    df['Date'] = df['Date'].dt.strftime('%d/%m/%Y')
+    return df
+
+
+# Function to list the season codes of n consecutive seasons ending with last_season (e.g. '2425')
+def season_codes(n_seasons, last_season='2425'):
+    last_year = int(last_season[:2])
+    return [f"{year % 100:02d}{(year + 1) % 100:02d}" for year in range(last_year - n_seasons + 1, last_year + 1)]
+
+
+def generate_archive(n_teams=20, n_seasons=1, n_leagues=1, seed=0):
+    # Generate several seasons of several leagues, returned as {(season, league): DataFrame}
+    leagues = [f"L{i + 1}" for i in range(n_leagues)]
+    archive = {}
+    for season_number, season in enumerate(season_codes(n_seasons)):
+        for league_number, league in enumerate(leagues):
+            archive[(season, league)] = generate_season(league, season, n_teams, seed + season_number * 1000 + league_number)
+    return archive
+
+
+def write_archive(folder, n_teams=20, n_seasons=1, n_leagues=1, seed=0, zip_files=True):
+    # Write the archive as '<season>/<league>.csv' files, plus a '<season>/data.zip' per season like football-data
+    archive = generate_archive(n_teams, n_seasons, n_leagues, seed)
+    paths = []
+    for (season, league), df in archive.items():
+        season_folder = os.path.join(folder, season)
+        os.makedirs(season_folder, exist_ok=True)
+        path = os.path.join(season_folder, f"{league}.csv")
+        df.to_csv(path, index=False)
+        paths.append(path)
+
+    if zip_files:
+        for season in sorted({season for season, _ in archive}):
+            season_folder = os.path.join(folder, season)
+            with zipfile.ZipFile(os.path.join(season_folder, 'data.zip'), 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+                for league in sorted(league for s, league in archive if s == season):
+                    zip_ref.write(os.path.join(season_folder, f"{league}.csv"), f"{league}.csv")
+
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic football-data CSV files.")
+    parser.add_argument('--folder', type=str, default='synthetic_data', help="Output folder.")
+    parser.add_argument('--teams', type=int, default=20, help="Teams per league.")
+    parser.add_argument('--seasons', type=int, default=1, help="Number of seasons.")
+    parser.add_argument('--leagues', type=int, default=1, help="Number of leagues.")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    paths = write_archive(args.folder, args.teams, args.seasons, args.leagues, args.seed)
+    print(f"{len(paths)} files written to {args.folder}")
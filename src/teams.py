@@ -0,0 +1,265 @@
+import os
+import re
+import json
+import difflib
+import argparse
+import unicodedata
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+# Default location of the persistent team index
+DEFAULT_TEAM_INDEX_PATH = 'team_index.json'
+
+# Other spellings of football-data team names, e.g. the full club names of other data sources.
+# Normalization only ignores accents, case and punctuation, so each variant of a club is listed
+# explicitly: words like 'AFC' can tell clubs apart ('AFC Wimbledon' is not 'Wimbledon').
+KNOWN_TEAM_ALIASES = {
+    'Middlesboro': 'Middlesbrough',
+    'Manchester United': 'Man United',
+    'Manchester City': 'Man City',
+    'Nottingham Forest': "Nott'm Forest",
+    'Sheffield Wednesday': 'Sheffield Weds',
+    'Queens Park Rangers': 'QPR',
+    'West Bromwich Albion': 'West Brom',
+}
+
+# Football-data leagues whose top division is numbered 0 (E0 is the Premier League, SC0 the Scottish Premiership)
+ZERO_BASED_COUNTRIES = {'E', 'SC'}
+
+# Leagues without a division number, e.g. the English National League
+LEAGUE_TIERS = {'EC': 5}
+
+
+# Function to normalize a team name for alias lookups: no accents, case or punctuation
+def normalize_team_name(name):
+    name = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', name.casefold()).split()) or name.casefold().strip()
+
+
+_KNOWN_ALIAS_KEYS = {normalize_team_name(alias): normalize_team_name(name) for alias, name in KNOWN_TEAM_ALIASES.items()}
+
+
+# Function to get the lookup key of a team name: its normalized name, or that of the spelling it is a known alias of
+def team_name_key(name):
+    key = normalize_team_name(name)
+    return _KNOWN_ALIAS_KEYS.get(key, key)
+
+
+# Function to get the start year of a season code, e.g. 1999 for '9900' and 2024 for '2425'
+def season_start_year(season):
+    year = int(str(season)[:2])
+    return year + (1900 if year >= 50 else 2000)
+
+
+# Function to get the tier of a football-data league code (1 is the top division), None if unknown
+def league_tier(league):
+    if league in LEAGUE_TIERS:
+        return LEAGUE_TIERS[league]
+    match = re.fullmatch(r'([A-Z]+)(\d+)', league)
+    if not match:
+        return None
+    country, division = match.groups()
+    return int(division) + (1 if country in ZERO_BASED_COUNTRIES else 0)
+
+
+def _league_country(league):
+    return re.sub(r'\d+$', '', league)
+
+
+class TeamIndex:
+    """
+    Persistent index of the teams of the whole archive.
+
+    Every team gets a stable integer ID. Names are normalized (accents, case and punctuation
+    are ignored) and mapped to IDs through a dictionary, so lookups are O(1). Spelling
+    variants of a team are aliases: the ones in KNOWN_TEAM_ALIASES, and any registered with
+    add_alias. The index
+    also records the league of each team in every season, from which promotions and
+    relegations are derived. It is saved as JSON, so IDs stay the same across runs.
+    """
+
+    def __init__(self):
+        self.names = []          # Team ID -> display name (first spelling seen)
+        self.aliases = {}        # Normalized name -> team ID
+        self.history = []        # Team ID -> {season: league}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return team_name_key(name) in self.aliases
+
+    def register(self, name, season=None, league=None):
+        # Get the ID of a team, adding it to the index if it is new, and record its league in the season
+        key = team_name_key(name)
+        team_id = self.aliases.get(key)
+        if team_id is None:
+            team_id = len(self.names)
+            self.names.append(str(name))
+            self.history.append({})
+            self.aliases[key] = team_id
+        if season is not None and league is not None:
+            self.history[team_id][str(season)] = league
+        return team_id
+
+    def register_matches(self, df, season, league):
+        # Register the home and away teams of a league season
+        teams = pd.unique(pd.concat([df['HomeTeam'].astype(str), df['AwayTeam'].astype(str)]))
+        return [self.register(team, season, league) for team in teams]
+
+    def add_alias(self, alias, name):
+        # Map another spelling of a known team to its ID
+        team_id = self.team_id(name)
+        key = team_name_key(alias)
+        if self.aliases.get(key, team_id) != team_id:
+            raise ValueError(f"Alias {alias} already belongs to {self.names[self.aliases[key]]}")
+        self.aliases[key] = team_id
+        return team_id
+
+    def suggest(self, name, n=3):
+        # Closest known team names, for error messages
+        matches = difflib.get_close_matches(team_name_key(name), list(self.aliases), n=n, cutoff=0.6)
+        return list(dict.fromkeys(self.names[self.aliases[match]] for match in matches))
+
+    def team_id(self, name):
+        try:
+            return self.aliases[team_name_key(name)]
+        except KeyError:
+            suggestions = self.suggest(name)
+            hint = f" Did you mean: {', '.join(suggestions)}?" if suggestions else ""
+            raise KeyError(f"Unknown team: {name}.{hint}")
+
+    def name(self, team_id):
+        return self.names[team_id]
+
+    def encode(self, names, unknown=-1):
+        # Integer team IDs of an array of names, each distinct name is normalized only once
+        codes, uniques = pd.factorize(pd.Series(names).astype(str))
+        unique_ids = np.array([self.aliases.get(team_name_key(name), unknown) for name in uniques], dtype=np.int32)
+        return unique_ids[codes]
+
+    def decode(self, team_ids):
+        return np.array(self.names, dtype=object)[np.asarray(team_ids)]
+
+    def seasons(self, name):
+        # (season, league) pairs of a team in chronological order
+        history = self.history[self.team_id(name)]
+        return sorted(history.items(), key=lambda item: season_start_year(item[0]))
+
+    def league_changes(self):
+        """
+        List the league changes between consecutive seasons of every team.
+
+        Returns:
+        - changes (DataFrame): Team, TeamID, Season, FromLeague, ToLeague and Movement
+          ('promotion', 'relegation' or 'transfer' when the tiers cannot be compared).
+        """
+        rows = []
+        for team_id, history in enumerate(self.history):
+            seasons = sorted(history, key=season_start_year)
+            for previous_season, season in zip(seasons, seasons[1:]):
+                from_league, to_league = history[previous_season], history[season]
+                if from_league == to_league or season_start_year(season) != season_start_year(previous_season) + 1:
+                    continue
+                from_tier, to_tier = league_tier(from_league), league_tier(to_league)
+                if from_tier is None or to_tier is None or _league_country(from_league) != _league_country(to_league):
+                    movement = 'transfer'
+                else:
+                    movement = 'promotion' if to_tier < from_tier else 'relegation'
+                rows.append((self.names[team_id], team_id, season, from_league, to_league, movement))
+        return pd.DataFrame(rows, columns=['Team', 'TeamID', 'Season', 'FromLeague', 'ToLeague', 'Movement'])
+
+    def to_dict(self):
+        return {
+            'teams': [{'id': team_id, 'name': name, 'seasons': self.history[team_id]} for team_id, name in enumerate(self.names)],
+            'aliases': self.aliases,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        for team in sorted(data['teams'], key=lambda team: team['id']):
+            index.names.append(team['name'])
+            index.history.append(dict(team['seasons']))
+        index.aliases = {alias: int(team_id) for alias, team_id in data['aliases'].items()}
+        return index
+
+    def save(self, path=DEFAULT_TEAM_INDEX_PATH):
+        # Write to a temporary file first, so readers never see a half-written index
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path + '.tmp', 'w') as index_file:
+            json.dump(self.to_dict(), index_file, indent=1)
+        os.replace(path + '.tmp', path)
+        return path
+
+    @classmethod
+    def load(cls, path=DEFAULT_TEAM_INDEX_PATH):
+        # Load a saved index, or start an empty one if the file does not exist
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r') as index_file:
+            return cls.from_dict(json.load(index_file))
+
+
+@contextmanager
+def locked_team_index(path=DEFAULT_TEAM_INDEX_PATH):
+    """
+    Load the team index for an update and save it afterwards. A lock file serializes the
+    updates of parallel processes (e.g. backfill tasks), so no registered team is lost.
+    """
+    with open(path + '.lock', 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            index = TeamIndex.load(path)
+            yield index
+            index.save(path)
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+# Function to build a team index from the seasons and leagues of the match store
+def build_team_index(store_folder, index=None):
+    from load import read_matches_from_store
+
+    if index is None:
+        index = TeamIndex()
+    matches = read_matches_from_store(store_folder, columns=['League', 'Season', 'HomeTeam', 'AwayTeam'])
+    for (league, season), league_matches in matches.groupby(['League', 'Season'], observed=True, sort=False):
+        index.register_matches(league_matches, season, league)
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build and query the persistent team index.")
+    parser.add_argument('--index', type=str, default=DEFAULT_TEAM_INDEX_PATH, help="Team index JSON file.")
+    parser.add_argument('--build', type=str, help="Register the teams of every league and season of this match store.")
+    parser.add_argument('--alias', type=str, nargs=2, metavar=('ALIAS', 'TEAM'), help="Register another spelling of a team.")
+    parser.add_argument('--team', type=str, help="Show the seasons and leagues of a team.")
+    parser.add_argument('--changes', action='store_true', help="List the promotions and relegations.")
+    args = parser.parse_args()
+
+    if args.build or args.alias:
+        with locked_team_index(args.index) as team_index:
+            if args.build:
+                build_team_index(args.build, team_index)
+            if args.alias:
+                team_index.add_alias(*args.alias)
+        print(f"{len(team_index)} teams saved to {args.index}")
+
+    team_index = TeamIndex.load(args.index)
+    if args.team:
+        print(f"{team_index.name(team_index.team_id(args.team))} (ID {team_index.team_id(args.team)})")
+        for season, league in team_index.seasons(args.team):
+            print(f"{season}: {league}")
+    if args.changes:
+        print(team_index.league_changes().to_string(index=False))
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import generate_archive
+from transform import calculate_xg, parse_match_dates
+from backtest import prior_team_totals, walk_forward_predictions, TEAM_TOTAL_COLUMNS
+
+
+@pytest.fixture(scope='module')
+def matches():
+    archive = generate_archive(n_teams=10, n_seasons=2, n_leagues=2, seed=5)
+    df = pd.concat([season.assign(Season=code) for (code, _), season in archive.items()], ignore_index=True)
+    return calculate_xg(df)
+
+
+def test_prior_totals_only_count_earlier_matches(matches):
+    # Shuffled rows: the totals follow the dates, not the file order
+    df = matches.sample(frac=1, random_state=0).reset_index(drop=True)
+    home_totals, away_totals = prior_team_totals(df, ['Div', 'Season'])
+    dates = parse_match_dates(df['Date'])
+
+    for i in [0, 17, 150, len(df) - 1]:
+        group = (df['Div'] == df['Div'][i]) & (df['Season'] == df['Season'][i])
+        for team, totals in [(df['HomeTeam'][i], home_totals), (df['AwayTeam'][i], away_totals)]:
+            earlier = df[group & (dates < dates[i])]
+            home, away = earlier[earlier['HomeTeam'] == team], earlier[earlier['AwayTeam'] == team]
+            expected = {
+                'Matches': len(home) + len(away),
+                'GF': home['FTHG'].sum() + away['FTAG'].sum(),
+                'GA': home['FTAG'].sum() + away['FTHG'].sum(),
+                'xG_Scored': home['Home_xG_scored'].sum() + away['Away_xG_scored'].sum(),
+                'xG_Conceded': home['Home_xG_conceded'].sum() + away['Away_xG_conceded'].sum(),
+            }
+            for column in TEAM_TOTAL_COLUMNS:
+                assert totals[column][i] == pytest.approx(expected[column])
+
+
+def test_changing_a_later_match_leaves_earlier_predictions_unchanged(matches):
+    predictions = walk_forward_predictions(matches)
+    dates = parse_match_dates(matches['Date'])
+
+    # Perturb a match in the middle of a season (the second league of the first season)
+    changed_row = 120
+    perturbed = matches.copy()
+    perturbed.loc[changed_row, ['FTHG', 'FTAG', 'FTR']] = [7, 0, 'H']
+    perturbed.loc[changed_row, ['Home_xG_scored', 'Away_xG_conceded']] += 3.0
+    perturbed_predictions = walk_forward_predictions(perturbed)
+
+    columns = ['Home_xG', 'Away_xG', 'HomeWinProb', 'DrawProb', 'AwayWinProb', 'Predicted']
+    up_to_match = (dates <= dates[changed_row]).to_numpy()
+    pd.testing.assert_frame_equal(perturbed_predictions.loc[up_to_match, columns], predictions.loc[up_to_match, columns], check_exact=True)
+
+    # Later matches of the two teams do see the change
+    teams = {matches['HomeTeam'][changed_row], matches['AwayTeam'][changed_row]}
+    later = ~up_to_match & matches['HomeTeam'].isin(teams).to_numpy() & predictions['Predicted'].to_numpy()
+    assert later.any()
+    assert not np.allclose(perturbed_predictions.loc[later, 'Home_xG'], predictions.loc[later, 'Home_xG'])
@@ -0,0 +1,18 @@
+from benchmark import compare_with_baseline
+
+
+def _result(calibration_seconds, stage_seconds):
+    return {
+        'config': {'teams': 20, 'seasons': 1, 'leagues': 1, 'seed': 0, 'rows': 380},
+        'calibration_seconds': calibration_seconds,
+        'stages': {'aggregate_team_stats': {'seconds': stage_seconds}},
+        'checksums': {'Points': 1000.0},
+    }
+
+
+def test_baseline_is_scaled_to_the_speed_of_the_machine():
+    baseline = _result(0.05, 0.1)
+    # A machine twice as slow takes twice as long everywhere: no regression
+    assert compare_with_baseline(_result(0.1, 0.2), baseline) == []
+    # The same stage time on a machine twice as fast is a regression
+    assert len(compare_with_baseline(_result(0.025, 0.1), baseline)) == 1
@@ -0,0 +1,152 @@
+import os
+import zipfile
+import threading
+import functools
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+import pytest
+import requests
+import extract
+from extract import fetch_zip, download_and_extract_zip
+
+
+class RecordingHandler(SimpleHTTPRequestHandler):
+    # Static file handler recording the status code and body size of every response.
+    # Both are recorded before the headers are sent, so the client never sees a response first.
+    recorded = []
+
+    def send_response(self, code, message=None):
+        self.recorded.append([self.path, code, 0])
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword == 'Content-Length':
+            self.recorded[-1][2] = int(value)
+        super().send_header(keyword, value)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def season_server(tmp_path):
+    # Serve a season ZIP from a local http.server (Last-Modified / If-Modified-Since revalidation)
+    served_folder = tmp_path / 'served'
+    (served_folder / '2425').mkdir(parents=True)
+    with zipfile.ZipFile(served_folder / '2425' / 'data.zip', 'w') as zip_file:
+        zip_file.writestr('I1.csv', 'Div,Date,HomeTeam,AwayTeam,FTHG,FTAG,FTR\nI1,17/08/2024,A,B,1,0,H\n')
+
+    RecordingHandler.recorded = []
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(RecordingHandler, directory=str(served_folder)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/2425/data.zip", RecordingHandler.recorded
+    server.shutdown()
+    server.server_close()
+
+
+# Snapshot of the cache folder: relative path -> file content
+def _cache_snapshot(cache_folder):
+    snapshot = {}
+    for folder, _, files in os.walk(cache_folder):
+        for name in files:
+            path = os.path.join(folder, name)
+            with open(path, 'rb') as cached_file:
+                snapshot[os.path.relpath(path, cache_folder)] = cached_file.read()
+    return snapshot
+
+
+def test_repeated_fetch_is_revalidated_without_body_or_writes(season_server, tmp_path):
+    url, responses = season_server
+    cache_folder = str(tmp_path / 'cache')
+
+    archive_path, archive_hash, downloaded_bytes = fetch_zip(url, cache_folder)
+    assert downloaded_bytes > 0
+    assert zipfile.ZipFile(archive_path).namelist() == ['I1.csv']
+    snapshot = _cache_snapshot(cache_folder)
+
+    cached_path, cached_hash, downloaded_bytes = fetch_zip(url, cache_folder)
+    assert (cached_path, cached_hash, downloaded_bytes) == (archive_path, archive_hash, 0)
+
+    # The second request is answered with 304 and no body, and the cache files are unchanged
+    assert [status for _, status, _ in responses] == [200, 304]
+    assert responses[1][2] == 0
+    assert _cache_snapshot(cache_folder) == snapshot
+
+
+def test_fresh_and_offline_entries_skip_the_network(season_server, tmp_path):
+    url, responses = season_server
+    cache_folder = str(tmp_path / 'cache')
+
+    fetch_zip(url, cache_folder)
+    fetch_zip(url, cache_folder, max_age=3600)
+    fetch_zip(url, cache_folder, offline=True)
+    assert len(responses) == 1
+
+
+def test_offline_miss_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        fetch_zip('http://127.0.0.1:9/2425/data.zip', str(tmp_path / 'cache'), offline=True)
+
+
+class TruncatingHandler(RecordingHandler):
+    # Announces the full archive but closes the connection after the first bytes
+    def copyfile(self, source, outputfile):
+        outputfile.write(source.read(16))
+        self.close_connection = True
+
+
+def test_interrupted_download_leaves_no_partial_file(season_server, tmp_path):
+    served_folder = tmp_path / 'served'
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(TruncatingHandler, directory=str(served_folder)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    cache_folder = tmp_path / 'cache'
+    try:
+        with pytest.raises(requests.RequestException):
+            fetch_zip(f"http://127.0.0.1:{server.server_address[1]}/2425/data.zip", str(cache_folder))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert os.listdir(cache_folder / 'blobs') == []
+
+
+def test_failed_download_raises_instead_of_exiting(tmp_path):
+    # A failed download must reach the caller's except Exception handlers (e.g. a backfill task)
+    with pytest.raises(FileNotFoundError):
+        download_and_extract_zip('http://127.0.0.1:9/2425/data.zip', str(tmp_path / '24_25'),
+                                 cache_folder=str(tmp_path / 'cache'), offline=True)
+
+
+@pytest.mark.parametrize('status', [304, 404])
+def test_streamed_response_is_closed_without_download(season_server, tmp_path, monkeypatch, status):
+    url, _ = season_server
+    cache_folder = str(tmp_path / 'cache')
+    fetch_zip(url, cache_folder)
+
+    requests_get = requests.get
+    responses = []
+
+    def recording_get(*args, **kwargs):
+        responses.append(requests_get(*args, **kwargs))
+        return responses[-1]
+
+    monkeypatch.setattr(requests, 'get', recording_get)
+    if status == 304:
+        fetch_zip(url, cache_folder)
+    else:
+        with pytest.raises(ConnectionError):
+            fetch_zip(url.replace('2425', '2526'), cache_folder)
+    assert responses[0].status_code == status
+    assert responses[0].raw.closed
+
+
+def test_failure_before_the_partial_file_exists_is_raised(season_server, tmp_path, monkeypatch):
+    url, _ = season_server
+
+    def read_only_open(path, *args, **kwargs):
+        raise PermissionError(f"Read-only cache: {path}")
+
+    # The original error is raised, not a FileNotFoundError of the cleanup
+    monkeypatch.setattr(extract, 'open', read_only_open, raising=False)
+    with pytest.raises(PermissionError):
+        fetch_zip(url, str(tmp_path / 'cache'))
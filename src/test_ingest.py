@@ -0,0 +1,33 @@
+import io
+import pytest
+from ingest import read_matches_csv
+
+
+def _csv(text):
+    return io.BytesIO(text.encode('utf-8'))
+
+
+def test_current_column_wins_over_its_alias():
+    # 'BbAvH' is the old name of 'AvgH', and 'HG'/'AG' the old names of 'FTHG'/'FTAG'
+    source = _csv(
+        "Div,Date,HomeTeam,AwayTeam,HG,FTHG,FTAG,AG,FTR,AvgH,BbAvH\n"
+        "I1,17/08/2024,Genoa,Inter,9,2,1,9,H,2.10,9.99\n"
+    )
+    df = read_matches_csv(source, column_sets=('core', 'odds'))
+
+    assert not df.columns.duplicated().any()
+    assert df['FTHG'].tolist() == [2]
+    assert df['FTAG'].tolist() == [1]
+    assert df['AvgH'].tolist() == pytest.approx([2.1])
+
+
+def test_first_alias_is_used_when_the_current_column_is_missing():
+    source = _csv(
+        "Div,Date,HT,Home,AT,FTHG,FTAG,FTR\n"
+        "I1,17/08/2024,Genoa,Other,Inter,2,1,H\n"
+    )
+    df = read_matches_csv(source)
+
+    assert not df.columns.duplicated().any()
+    assert df['HomeTeam'].astype(str).tolist() == ['Genoa']
+    assert df['AwayTeam'].astype(str).tolist() == ['Inter']
@@ -0,0 +1,73 @@
+import pandas as pd
+import pytest
+from synthetic import generate_archive
+from load import save_matches_to_store, read_matches_from_store, query_matches
+
+
+@pytest.fixture
+def seasons():
+    archive = generate_archive(n_teams=20, n_seasons=2, n_leagues=1, seed=0)
+    return archive[('2324', 'L1')], archive[('2425', 'L1')]
+
+
+def test_store_round_trip_across_partitions_with_different_columns(seasons, tmp_path):
+    # The older season has no Bet365 odds, the newer one adds odds and a referee column
+    older, newer = seasons
+    older = older.drop(columns=['B365H', 'B365D', 'B365A'])
+    newer = newer.assign(Referee='M Oliver')
+    store_folder = str(tmp_path / 'store')
+    save_matches_to_store(older, store_folder, 'L1', '2324')
+    save_matches_to_store(newer, store_folder, 'L1', '2425')
+
+    matches = read_matches_from_store(store_folder)
+    assert len(matches) == len(older) + len(newer)
+    assert set(older.columns) | set(newer.columns) <= set(matches.columns)
+
+    by_season = matches.groupby('Season')
+    assert by_season['B365H'].count().to_dict() == {'2324': 0, '2425': len(newer)}
+    assert by_season['Referee'].count().to_dict() == {'2324': 0, '2425': len(newer)}
+
+    newer_matches = matches[matches['Season'] == '2425'].reset_index(drop=True)
+    assert newer_matches['B365H'].tolist() == newer['B365H'].tolist()
+    assert newer_matches['HomeTeam'].astype(str).tolist() == newer['HomeTeam'].tolist()
+    assert newer_matches['FTHG'].tolist() == newer['FTHG'].tolist()
+
+
+def test_query_reads_columns_of_other_partitions(seasons, tmp_path):
+    older, newer = seasons
+    store_folder = str(tmp_path / 'store')
+    save_matches_to_store(newer.assign(Referee='M Oliver'), store_folder, 'L1', '2425')
+    save_matches_to_store(older, store_folder, 'L1', '2324')
+
+    # The partition read first has no Referee column, the query still finds it
+    matches = query_matches(store_folder, seasons=['2425'], columns=['HomeTeam', 'Referee'])
+    assert len(matches) == len(newer)
+    assert (matches['Referee'] == 'M Oliver').all()
+
+    since = pd.Timestamp('2024-01-01')
+    recent = query_matches(store_folder, seasons=['2324'], since=since)
+    assert len(recent) > 0
+    assert (recent['Date'] >= since).all()
+    assert (recent['Season'] == '2324').all()
+
+
+def test_rewriting_a_partition_replaces_it(seasons, tmp_path):
+    older, _ = seasons
+    store_folder = str(tmp_path / 'store')
+    save_matches_to_store(older, store_folder, 'L1', '2324')
+    save_matches_to_store(older.head(10), store_folder, 'L1', '2324')
+    assert len(read_matches_from_store(store_folder)) == 10
+
+
+def test_query_opens_only_the_selected_partitions(seasons, tmp_path):
+    older, newer = seasons
+    store_folder = str(tmp_path / 'store')
+    save_matches_to_store(older, store_folder, 'L1', '2324')
+    save_matches_to_store(newer.assign(Referee='M Oliver'), store_folder, 'L2', '2425')
+
+    # The unified schema is saved with the store, so an unreadable file of another partition is never opened
+    with open(next((tmp_path / 'store' / 'League=L2' / 'Season=2425').iterdir()), 'wb') as damaged_file:
+        damaged_file.write(b'not parquet')
+    matches = query_matches(store_folder, leagues=['L1'], columns=['HomeTeam', 'Referee'])
+    assert len(matches) == len(older)
+    assert matches['Referee'].isna().all()
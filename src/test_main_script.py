@@ -0,0 +1,28 @@
+import json
+import pytest
+from main_script import main, run_command, build_command_parser
+
+
+@pytest.fixture
+def offline_workspace(tmp_path, monkeypatch):
+    # A workspace with an empty download cache: every offline run fails to find its season
+    monkeypatch.chdir(tmp_path)
+    config = {
+        'base_url': 'http://127.0.0.1:9/{season_year}/data.zip', 'file_format': '{file_name}.csv',
+        'cache_folder': 'download_cache', 'match_store_folder': None, 'team_index_file': None, 'metrics_file': None,
+    }
+    (tmp_path / 'config.json').write_text(json.dumps(config))
+
+
+def test_legacy_invocation_exits_with_status_1_on_error(offline_workspace, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main('2425', 'I1', offline=True, charts='off')
+    assert exit_info.value.code == 1
+    assert 'Error while processing season 2425 and file I1' in capsys.readouterr().out
+
+
+def test_subcommand_exits_with_status_1_on_error(offline_workspace, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        run_command(build_command_parser().parse_args(['transform', '--season', '2425', '--file', 'I1', '--offline']))
+    assert exit_info.value.code == 1
+    assert 'Error in transform for season 2425' in capsys.readouterr().out
@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+from metrics import StageMetrics, _current_rss_mb
+
+
+@pytest.mark.skipif(_current_rss_mb() is None, reason="resident memory is read from /proc")
+def test_stage_memory_is_measured_per_stage():
+    metrics = StageMetrics(trace_memory=True)
+    with metrics.stage('heavy'):
+        values = np.ones(25_000_000)
+        values += 1
+    del values
+    with metrics.stage('light'):
+        np.ones(1000)
+
+    heavy, light = metrics.records
+    assert heavy['rss_delta_mb'] > 100 and heavy['peak_traced_mb'] > 100
+    # The stage after the heaviest one does not inherit its peak
+    assert light['rss_delta_mb'] < 50 and light['peak_traced_mb'] < 1
+    # The high-water mark still covers the heavy stage (ru_maxrss and /proc differ by a few pages)
+    assert light['process_peak_rss_mb'] > heavy['rss_delta_mb']
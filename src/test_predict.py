@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import generate_season
+from transform import calculate_match_columns, aggregate_team_stats
+from predict import (predict_fixtures, predict_match_with_suggestions, calculate_match_xg, find_team_stats,
+                     calculate_match_outcome_probabilities, suggest_possible_results, suggest_possible_results_batch)
+
+
+@pytest.fixture(scope='module')
+def season():
+    matches = generate_season('L1', '2425', n_teams=20, seed=1)
+    return aggregate_team_stats(calculate_match_columns(matches.copy())), matches[['HomeTeam', 'AwayTeam']]
+
+
+@pytest.mark.parametrize('max_goals', [1, 2, 6, 10])
+def test_batch_predictions_match_single_predictions(season, max_goals):
+    team_stats, fixtures = season
+    predictions, goal_matrices = predict_fixtures(team_stats, fixtures, max_goals=max_goals)
+    assert goal_matrices.shape == (len(fixtures), max_goals, max_goals)
+
+    for (home, away), prediction in zip(fixtures.itertuples(index=False), predictions.itertuples(index=False)):
+        predicted_home_goals, predicted_away_goals, suggestions = predict_match_with_suggestions(team_stats, home, away, max_goals)
+        assert (prediction.PredictedHomeGoals, prediction.PredictedAwayGoals) == (predicted_home_goals, predicted_away_goals)
+        assert prediction.Suggestions == suggestions
+
+        home_xg, away_xg = calculate_match_xg(find_team_stats(team_stats, home), find_team_stats(team_stats, away))
+        probabilities = calculate_match_outcome_probabilities(home_xg, away_xg, max_goals)[:3]
+        np.testing.assert_allclose([prediction.HomeWinProb, prediction.DrawProb, prediction.AwayWinProb], probabilities, rtol=1e-12)
+
+
+def test_tied_scorelines_keep_the_order_of_the_single_prediction():
+    # Symmetric matrices: (1, 0) and (0, 1) tie on probability, and on distance when both teams
+    # are predicted the same number of goals, so only the row-major order decides
+    pmf = np.array([0.3, 0.35, 0.2, 0.15])
+    goal_matrices = np.stack([np.outer(pmf, pmf), np.outer(pmf[::-1], pmf[::-1])])
+    predicted_home_goals = np.array([1.0, 0.4])
+    predicted_away_goals = np.array([1.0, 1.6])
+
+    batch = suggest_possible_results_batch(goal_matrices, predicted_home_goals, predicted_away_goals, max_goals=4, top_k=3)
+    for i in range(2):
+        assert batch[i] == suggest_possible_results(goal_matrices[i], predicted_home_goals[i], predicted_away_goals[i], max_goals=4)
+    assert batch[0] == [(1, 1, 12.25), (0, 1, 10.5), (1, 0, 10.5)]
+
+
+def test_top_k_edges(season):
+    team_stats, fixtures = season
+    fixtures = fixtures.head(5)
+
+    predictions, _ = predict_fixtures(team_stats, fixtures, max_goals=1, top_k=3)
+    assert predictions['Suggestions'].tolist() == [[(0, 0, 100.0)]] * 5
+
+    predictions, _ = predict_fixtures(team_stats, fixtures, max_goals=3, top_k=1)
+    assert all(len(suggestions) == 1 for suggestions in predictions['Suggestions'])
+
+    # top_k above the number of scorelines returns every scoreline, most likely first
+    predictions, _ = predict_fixtures(team_stats, fixtures, max_goals=3, top_k=100)
+    for suggestions in predictions['Suggestions']:
+        assert sorted((home, away) for home, away, _ in suggestions) == [(home, away) for home in range(3) for away in range(3)]
+        assert [prob for _, _, prob in suggestions] == sorted((prob for _, _, prob in suggestions), reverse=True)
+        assert sum(prob for _, _, prob in suggestions) == pytest.approx(100, abs=0.1)
+
+    predictions, _ = predict_fixtures(team_stats, fixtures.iloc[:0])
+    assert predictions.empty
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from scipy.stats import poisson
+from probability import poisson_pmf_table, poisson_pmf_row, poisson_cdf
+
+# Typical xG values, plus the edge cases: no goals expected, missing and invalid (negative) lambdas
+LAMBDAS = np.array([0.0, 0.11, 0.5, 1.0, 1.37, 2.5, 4.0, 9.5, np.nan, -0.5])
+
+
+@pytest.mark.parametrize('cache', [True, False])
+def test_pmf_table_matches_scipy(cache):
+    goals = np.arange(8)
+    expected = poisson.pmf(goals[np.newaxis, :], LAMBDAS[:, np.newaxis])
+    np.testing.assert_allclose(poisson_pmf_table(LAMBDAS, 8, cache=cache), expected, rtol=1e-12, atol=1e-15)
+
+    # Any shape of lambdas, with repeated values shared through the cache
+    grid = np.tile(LAMBDAS, (3, 1))
+    assert poisson_pmf_table(grid, 8, cache=cache).shape == (3, len(LAMBDAS), 8)
+    np.testing.assert_allclose(poisson_pmf_table(grid, 8, cache=cache)[2], expected, rtol=1e-12, atol=1e-15)
+
+
+def test_pmf_row_matches_scipy():
+    goals = np.arange(6)
+    for lam in LAMBDAS:
+        np.testing.assert_allclose(poisson_pmf_row(lam), poisson.pmf(goals, lam), rtol=1e-12, atol=1e-15)
+    assert not poisson_pmf_row(1.0).flags.writeable
+
+
+def test_cdf_matches_scipy():
+    k = np.array([-2.0, -1.0, -0.5, 0.0, 0.4, 1.0, 2.7, 5.0, 12.0, np.nan])
+    grid_k, grid_lambdas = np.meshgrid(k, LAMBDAS)
+    np.testing.assert_allclose(poisson_cdf(grid_k, grid_lambdas), poisson.cdf(grid_k, grid_lambdas), rtol=1e-12, atol=1e-15)
+    assert poisson_cdf(0.0, 0.0) == 1.0
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.optimize import approx_fprime
+from synthetic import generate_season
+from ratings import fit_ratings, _negative_log_likelihood
+
+
+def test_gradient_matches_finite_differences():
+    rng = np.random.default_rng(0)
+    n_teams, n_matches = 6, 200
+    home_ids = rng.integers(0, n_teams, n_matches)
+    away_ids = (home_ids + rng.integers(1, n_teams, n_matches)) % n_teams
+    arguments = (home_ids, away_ids, rng.poisson(1.5, n_matches).astype(float), rng.poisson(1.1, n_matches).astype(float),
+                 rng.uniform(0.2, 1, n_matches), n_teams, 0.1)
+    params = rng.normal(0, 0.3, 2 + 2 * n_teams)
+
+    _, gradient = _negative_log_likelihood(params, *arguments)
+    numerical_gradient = approx_fprime(params, lambda x: _negative_log_likelihood(x, *arguments)[0], 1e-6)
+    np.testing.assert_allclose(gradient, numerical_gradient, rtol=1e-4, atol=1e-4)
+
+
+@pytest.fixture(scope='module')
+def known_strengths():
+    # Every pair of 8 teams meets 40 times at home, with goals drawn from known ratings
+    rng = np.random.default_rng(1)
+    teams = [f"Team {i}" for i in range(8)]
+    attack = np.array([0.4, 0.25, 0.1, 0.0, 0.0, -0.1, -0.25, -0.4])
+    defence = rng.permutation(attack)
+    pairs = np.array([(home, away) for home in range(8) for away in range(8) if home != away] * 40)
+    home_rate = np.exp(0.1 + 0.3 + attack[pairs[:, 0]] - defence[pairs[:, 1]])
+    away_rate = np.exp(0.1 + attack[pairs[:, 1]] - defence[pairs[:, 0]])
+    matches = pd.DataFrame({
+        'Date': pd.Timestamp('2024-08-15') + pd.to_timedelta(np.arange(len(pairs)) // 4, unit='D'),
+        'HomeTeam': np.array(teams)[pairs[:, 0]], 'AwayTeam': np.array(teams)[pairs[:, 1]],
+        'FTHG': rng.poisson(home_rate), 'FTAG': rng.poisson(away_rate),
+    })
+    return matches, teams, attack, defence
+
+
+def test_fit_recovers_known_strengths(known_strengths):
+    matches, teams, attack, defence = known_strengths
+    ratings = fit_ratings(matches, decay_rate=0, regularization=1e-3)
+
+    order = [ratings.team_ids[team] for team in teams]
+    # Attack and defence are only defined up to a shared shift, so they are compared centred
+    np.testing.assert_allclose(ratings.attack[order] - ratings.attack.mean(), attack - attack.mean(), atol=0.08)
+    np.testing.assert_allclose(ratings.defence[order] - ratings.defence.mean(), defence - defence.mean(), atol=0.08)
+    assert ratings.home_advantage == pytest.approx(0.3, abs=0.05)
+
+
+def test_warm_start_reaches_the_same_optimum():
+    matches = generate_season('L1', '2425', n_teams=12, seed=4)
+    matches['Date'] = pd.to_datetime(matches['Date'], format='%d/%m/%Y')
+    earlier = matches[matches['Date'] < matches['Date'].max() - pd.Timedelta(days=28)]
+
+    cold = fit_ratings(matches)
+    warm = fit_ratings(matches, previous=fit_ratings(earlier))
+    assert warm.teams == cold.teams
+    np.testing.assert_allclose(warm.attack, cold.attack, atol=1e-4)
+    np.testing.assert_allclose(warm.defence, cold.defence, atol=1e-4)
+    assert warm.home_advantage == pytest.approx(cold.home_advantage, abs=1e-4)
+    assert warm.intercept == pytest.approx(cold.intercept, abs=1e-4)
@@ -0,0 +1,118 @@
+import os
+import json
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from service import TeamStatsIndex, PredictionService, encode_json
+
+
+def _write_team_stats(root_folder, league, season, team_stats):
+    folder = os.path.join(root_folder, f"{season[:2]}_{season[2:]}_parquet", 'processed_data')
+    os.makedirs(folder, exist_ok=True)
+    team_stats.to_parquet(os.path.join(folder, f"{league}.parquet"))
+
+
+@pytest.fixture
+def team_stats():
+    # 'Newcomer' has no matches yet, so its per-match stats are NaN
+    return pd.DataFrame({
+        'Team': ['Inter', 'Milan', 'Newcomer'],
+        'Matches': [10, 10, 0],
+        'GF': [20, 15, 0],
+        'GA': [8, 12, 0],
+        'xG_Scored': [18.5, 14.0, 0.0],
+        'xG_Conceded': [9.0, 11.5, 0.0],
+    })
+
+
+def test_nan_statistics_are_sent_as_null(tmp_path, team_stats):
+    _write_team_stats(str(tmp_path), 'I1', '2425', team_stats)
+    index = TeamStatsIndex(str(tmp_path))
+    index.scan()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        response = index.predict_batch('I1', '2425', [('Inter', 'Milan'), ('Newcomer', 'Milan')])
+    content = encode_json(response).decode('utf-8')
+
+    assert 'NaN' not in content
+    decoded = json.loads(content, parse_constant=lambda name: pytest.fail(f"Invalid JSON constant {name}"))
+    assert decoded[0]['home_xg'] > 0
+    assert decoded[1]['home_xg'] is None
+
+
+def test_reload_reads_tables_in_a_worker_thread(tmp_path, team_stats):
+    _write_team_stats(str(tmp_path), 'I1', '2425', team_stats)
+    index = TeamStatsIndex(str(tmp_path))
+    service = PredictionService(index, reload_interval=0.01)
+    loop_thread_loads = []
+
+    load_changes = index.load_changes
+
+    def recording_load_changes():
+        try:
+            asyncio.get_running_loop()
+            loop_thread_loads.append(True)
+        except RuntimeError:
+            pass
+        return load_changes()
+
+    index.load_changes = recording_load_changes
+
+    async def run_reloads():
+        reload_task = asyncio.create_task(service._reload_periodically())
+        while ('I1', '2425') not in index.tables:
+            await asyncio.sleep(0.01)
+        reload_task.cancel()
+
+    asyncio.run(asyncio.wait_for(run_reloads(), timeout=10))
+    assert index.tables[('I1', '2425')].teams == ['Inter', 'Milan', 'Newcomer']
+    assert loop_thread_loads == []
+
+
+@pytest.fixture
+def service(tmp_path, team_stats):
+    _write_team_stats(str(tmp_path), 'I1', '2425', team_stats)
+    index = TeamStatsIndex(str(tmp_path))
+    index.scan()
+    return PredictionService(index)
+
+
+def _post_batch(service, request):
+    return service.respond('POST', '/predict/batch', json.dumps(request).encode('utf-8'))
+
+
+@pytest.mark.parametrize('missing', ['league', 'season', 'fixtures'])
+def test_batch_without_a_required_key_is_a_bad_request(service, missing):
+    request = {'league': 'I1', 'season': '2425', 'fixtures': [['Inter', 'Milan']]}
+    del request[missing]
+    status, payload = _post_batch(service, request)
+    assert status == 400
+    assert missing in payload['error']
+
+
+@pytest.mark.parametrize('request_body', [
+    {'league': 'I1', 'season': '2425', 'fixtures': []},
+    {'league': 'I1', 'season': '2425', 'fixtures': [['Inter']]},
+    {'league': 'I1', 'season': '2425', 'fixtures': [['Inter', 'Milan']], 'max_goals': 0},
+    {'league': 'I1', 'season': '2425', 'fixtures': [['Inter', 'Milan']], 'max_goals': 100000},
+    {'league': 'I1', 'season': '2425', 'fixtures': [['Inter', 'Milan']], 'top_k': 0},
+    ['I1', '2425'],
+])
+def test_invalid_batch_is_a_bad_request(service, request_body):
+    assert _post_batch(service, request_body)[0] == 400
+
+
+@pytest.mark.parametrize('max_goals', ['0', '-1', '100000', 'many'])
+def test_predict_rejects_max_goals_out_of_range(service, max_goals):
+    status, _ = service.respond('GET', f'/predict?league=I1&season=2425&home=Inter&away=Milan&max_goals={max_goals}', b'')
+    assert status == 400
+
+
+def test_valid_requests_are_answered(service):
+    status, payload = service.respond('GET', '/predict?league=I1&season=2425&home=Inter&away=Milan&max_goals=1', b'')
+    assert status == 200
+    assert payload['suggestions'] == [[0, 0, 100.0]]
+    status, payload = _post_batch(service, {'league': 'I1', 'season': '2425', 'fixtures': [['Inter', 'Milan']], 'max_goals': 20})
+    assert status == 200 and len(payload) == 1
+    assert service.respond('GET', '/predict?league=I1&season=2425&home=Inter&away=Juventus', b'')[0] == 404
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+from synthetic import generate_season
+from transform import calculate_match_columns, aggregate_team_stats
+from simulate import simulate_season, remaining_fixtures
+
+
+@pytest.fixture(scope='module')
+def half_season():
+    # Table after the first half of a season, and the fixtures of the second half
+    matches = generate_season('L1', '2425', n_teams=8, seed=2)
+    played = matches.iloc[:len(matches) // 2].copy()
+    team_stats = aggregate_team_stats(calculate_match_columns(played))
+    return team_stats, remaining_fixtures(team_stats['Team'], played)
+
+
+def test_same_seed_gives_the_same_tables_for_any_workers_and_chunk_size(half_season):
+    team_stats, fixtures = half_season
+    summary, rank_distribution = simulate_season(team_stats, fixtures, n_simulations=2500, seed=7)
+    for workers, chunk_size in [(1, 1000), (1, 700), (2, 1000), (3, 2500)]:
+        other_summary, other_rank_distribution = simulate_season(
+            team_stats, fixtures, n_simulations=2500, seed=7, workers=workers, chunk_size=chunk_size
+        )
+        pd.testing.assert_frame_equal(other_summary, summary, check_exact=True)
+        pd.testing.assert_frame_equal(other_rank_distribution, rank_distribution, check_exact=True)
+
+    other_summary, _ = simulate_season(team_stats, fixtures, n_simulations=2500, seed=8)
+    assert not other_summary.equals(summary)
+    assert rank_distribution.sum(axis=1).round(12).eq(1).all()
+
+
+def test_final_table_ties_are_broken_by_goal_difference_then_goals_scored():
+    # No fixtures left: every simulation ends with the current table
+    team_stats = pd.DataFrame({
+        'Team': ['Tied C', 'Tied B', 'Low GD', 'High GF', 'Leader', 'Tied A'],
+        'Points': [40, 40, 40, 40, 50, 40],
+        'GF': [30, 30, 30, 35, 40, 30],
+        'GA': [20, 20, 25, 25, 10, 20],
+        'Matches': 20, 'xG_Scored': 25.0, 'xG_Conceded': 25.0,
+    })
+    fixtures = pd.DataFrame(columns=['HomeTeam', 'AwayTeam'])
+    _, rank_distribution = simulate_season(team_stats, fixtures, n_simulations=10, relegation_spots=1)
+
+    final_ranks = rank_distribution.idxmax(axis=1)
+    assert (rank_distribution.max(axis=1) == 1).all()
+    # Equal points, GD and GF keep the order of team_stats
+    assert final_ranks.sort_values().index.tolist() == ['Leader', 'High GF', 'Tied C', 'Tied B', 'Tied A', 'Low GD']
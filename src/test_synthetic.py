@@ -0,0 +1,16 @@
+import pandas as pd
+from synthetic import generate_season, generate_archive
+
+
+def test_season_dates_start_in_the_first_year_of_the_season():
+    for season, year in [('9596', 1995), ('9900', 1999), ('0001', 2000), ('2425', 2024)]:
+        dates = pd.to_datetime(generate_season(season_year=season, n_teams=4)['Date'], format='%d/%m/%Y')
+        assert dates.min() >= pd.Timestamp(year=year, month=8, day=15)
+        assert dates.max() < pd.Timestamp(year=year + 1, month=8, day=15)
+
+
+def test_archive_across_the_turn_of_the_century_is_in_date_order():
+    archive = generate_archive(n_teams=4, n_seasons=30)
+    first_dates = [pd.to_datetime(df['Date'], format='%d/%m/%Y').min() for df in archive.values()]
+    assert [season for season, _ in archive][:2] == ['9596', '9697']
+    assert first_dates == sorted(first_dates)
@@ -0,0 +1,90 @@
+import pandas as pd
+import pytest
+from teams import TeamIndex, normalize_team_name, league_tier
+from synthetic import generate_season
+from ratings import fit_ratings
+from predict import build_team_rows, find_team_stats, predict_match_with_suggestions, predict_fixtures
+
+
+def test_normalization_ignores_accents_case_and_punctuation():
+    assert normalize_team_name('Atlético  Madrid') == normalize_team_name('atletico-madrid')
+    assert normalize_team_name("Nott'm Forest") == 'nott m forest'
+
+
+def test_club_form_words_tell_clubs_apart():
+    index = TeamIndex()
+    wimbledon = index.register('Wimbledon', '0001', 'E0')
+    afc_wimbledon = index.register('AFC Wimbledon', '1112', 'E3')
+    assert wimbledon != afc_wimbledon
+    assert index.team_id('AFC Wimbledon') == afc_wimbledon
+    assert index.seasons('Wimbledon') == [('0001', 'E0')]
+    assert index.league_changes().empty
+
+
+def test_known_and_registered_aliases_share_the_team_id():
+    index = TeamIndex()
+    team_id = index.register('Middlesbrough', '0405', 'E0')
+    assert index.register('Middlesboro', '9900', 'E0') == team_id
+    man_united = index.register('Man United')
+    assert index.team_id('Manchester United') == man_united
+
+    index.add_alias('Boro', 'Middlesbrough')
+    assert index.team_id('BORO') == team_id
+    assert index.encode(['Middlesboro', 'Boro', 'Unknown']).tolist() == [team_id, team_id, -1]
+    with pytest.raises(ValueError):
+        index.add_alias('Man United', 'Middlesbrough')
+
+
+def test_unknown_team_suggests_close_names():
+    index = TeamIndex()
+    index.register('Sheffield United')
+    with pytest.raises(KeyError, match='Sheffield United'):
+        index.team_id('Sheffield Utd')
+
+
+def test_league_changes_and_save_load_round_trip(tmp_path):
+    index = TeamIndex()
+    index.register('Leicester', '2223', 'E0')
+    index.register('Leicester', '2324', 'E1')
+    index.register('Leicester', '2425', 'E0')
+    path = index.save(str(tmp_path / 'team_index.json'))
+
+    loaded = TeamIndex.load(path)
+    assert loaded.to_dict() == index.to_dict()
+    assert loaded.league_changes()['Movement'].tolist() == ['relegation', 'promotion']
+    assert (league_tier('E0'), league_tier('I1'), league_tier('EC')) == (1, 1, 5)
+
+
+def test_team_stats_lookup_by_name_and_alias():
+    team_stats = pd.DataFrame({'Team': ['Middlesbrough', 'Man United', 'Wimbledon'], 'Points': [50, 60, 40]})
+    index = TeamIndex()
+    for team in team_stats['Team']:
+        index.register(team)
+
+    assert find_team_stats(team_stats, 'Man United')['Points'] == 60
+    assert find_team_stats(team_stats, 'Middlesboro', index)['Points'] == 50
+    with pytest.raises(KeyError):
+        find_team_stats(team_stats, 'AFC Wimbledon', index)
+
+    # Team rows built once for several lookups
+    team_rows = build_team_rows(team_stats, index)
+    assert find_team_stats(team_stats, 'Manchester United', index, team_rows)['Points'] == 60
+    assert find_team_stats(team_stats, 'Wimbledon', index, team_rows)['Points'] == 40
+
+
+def test_ratings_predictions_resolve_other_spellings():
+    matches = generate_season('L1', '2425', n_teams=6).replace({'L1 Team 1': 'Man United'})
+    ratings = fit_ratings(matches)
+    index = TeamIndex()
+    for team in ratings.teams:
+        index.register(team)
+
+    expected = predict_match_with_suggestions(None, 'Man United', 'L1 Team 2', ratings=ratings)
+    assert predict_match_with_suggestions(None, 'Manchester United', 'L1 Team 2', ratings=ratings, team_index=index) == expected
+    with pytest.raises(KeyError):
+        predict_match_with_suggestions(None, 'Manchester United', 'L1 Team 2', ratings=ratings)
+
+    fixtures = pd.DataFrame({'HomeTeam': ['Manchester United', 'L1 Team 3'], 'AwayTeam': ['L1 Team 2', 'Manchester United']})
+    predictions, _ = predict_fixtures(None, fixtures, ratings=ratings, team_index=index)
+    assert predictions['PredictedHomeGoals'].iloc[0] == expected[0]
+    assert predictions['HomeTeam'].tolist() == fixtures['HomeTeam'].tolist()
@@ -0,0 +1,157 @@
+import io
+import os
+import zipfile
+import hashlib
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic import generate_season
+from extract import _cache_blob_path, _save_cache_entry
+from transform import (calculate_xg, calculate_expected_points, calculate_points, calculate_form, calculate_form_series,
+                       parse_match_dates)
+from predict import calculate_match_outcome_probabilities
+from main_script import process_file
+
+CONFIG = {
+    'base_url': 'http://127.0.0.1:9/{season_year}/data.zip', 'file_format': '{file_name}.csv', 'max_goals': 6,
+    'cache_folder': 'download_cache', 'extract_mode': 'stream', 'match_store_folder': None,
+    'team_index_file': None, 'metrics_file': None,
+}
+
+
+# Put a season ZIP with the given matches in the download cache, so process_file reads it offline
+def _cache_season(matches, season='2425', league='L1'):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zip_file:
+        zip_file.writestr(f"{league}.csv", matches.to_csv(index=False))
+    archive_hash = hashlib.sha256(archive.getvalue()).hexdigest()
+    blob_path = _cache_blob_path(CONFIG['cache_folder'], archive_hash)
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+    with open(blob_path, 'wb') as blob_file:
+        blob_file.write(archive.getvalue())
+    url = CONFIG['base_url'].format(season_year=season)
+    _save_cache_entry(CONFIG['cache_folder'], url, {'url': url, 'etag': None, 'last_modified': None, 'sha256': archive_hash})
+
+
+def _process(incremental=False, verify_incremental=False):
+    return process_file('2425', 'L1', None, None, CONFIG, offline=True, show_plot=False,
+                        incremental=incremental, verify_incremental=verify_incremental)
+
+
+def _assert_same_team_stats(team_stats, expected):
+    pd.testing.assert_frame_equal(
+        team_stats.sort_values('Team').reset_index(drop=True), expected.sort_values('Team').reset_index(drop=True),
+        check_dtype=False, rtol=1e-9
+    )
+
+
+@pytest.fixture
+def season(tmp_path, monkeypatch):
+    # process_file writes the history, totals and team stats next to the working directory
+    monkeypatch.chdir(tmp_path)
+    return generate_season('L1', '2425', n_teams=20)
+
+
+@pytest.mark.parametrize('n_new', [0, 10, 70])
+def test_incremental_run_matches_full_rebuild(season, n_new, capsys):
+    _cache_season(season.iloc[:len(season) - n_new])
+    _process(incremental=True)
+    _cache_season(season)
+    team_stats = _process(incremental=True, verify_incremental=True)
+    assert f"Incremental update: {n_new} new matches." in capsys.readouterr().out
+
+    _assert_same_team_stats(team_stats, _process())
+    # The third run starts from the history and totals saved by the incremental run
+    _assert_same_team_stats(_process(incremental=True), team_stats)
+
+
+def test_edited_match_falls_back_to_full_rebuild(season, capsys):
+    _cache_season(season)
+    _process(incremental=True)
+    edited = season.copy()
+    edited.loc[0, 'FTHG'] += 3
+    _cache_season(edited)
+    team_stats = _process(incremental=True, verify_incremental=True)
+
+    assert 'Incremental update' not in capsys.readouterr().out
+    _assert_same_team_stats(team_stats, _process())
+
+
+def test_verification_without_saved_history_is_reported_as_skipped(season, capsys):
+    _cache_season(season)
+    _process(incremental=True, verify_incremental=True)
+    assert 'Incremental verification skipped' in capsys.readouterr().out
+
+
+# Expected points of the original per-row loop, with the scipy.stats probabilities of each match
+def _scalar_expected_points(row, max_goals=6):
+    from scipy.stats import poisson
+
+    home_win_prob = draw_prob = away_win_prob = 0
+    for home_goals in range(max_goals):
+        for away_goals in range(max_goals):
+            prob = poisson.pmf(home_goals, row['Home_xG_scored']) * poisson.pmf(away_goals, row['Away_xG_scored'])
+            if home_goals > away_goals:
+                home_win_prob += prob
+            elif home_goals == away_goals:
+                draw_prob += prob
+            else:
+                away_win_prob += prob
+
+    home_win_prob_xg = poisson.cdf(row['Home_xG_scored'] - 1, row['Home_xG_conceded'])
+    away_win_prob_xg = poisson.cdf(row['Away_xG_scored'] - 1, row['Away_xG_conceded'])
+    draw_prob_xg = 1 - home_win_prob_xg - away_win_prob_xg
+    return [
+        3 * home_win_prob + draw_prob, 3 * away_win_prob + draw_prob,
+        3 * home_win_prob_xg + draw_prob_xg, 3 * away_win_prob_xg + draw_prob_xg,
+    ]
+
+
+def test_vectorized_expected_points_match_the_scalar_loop():
+    df = calculate_xg(generate_season('L1', '2425', n_teams=20, seed=3))
+    df = calculate_expected_points(df)
+
+    expected = np.array([_scalar_expected_points(row) for _, row in df.iterrows()])
+    columns = ['HomeExpectedPoints_Prob', 'AwayExpectedPoints_Prob', 'HomeExpectedPoints_xG', 'AwayExpectedPoints_xG']
+    np.testing.assert_allclose(df[columns].to_numpy(), expected, rtol=1e-12, atol=1e-12)
+
+    # The scalar prediction path gives the same outcome probabilities as the batch
+    home_win_prob, draw_prob, _, _ = calculate_match_outcome_probabilities(df['Home_xG_scored'].iloc[0], df['Away_xG_scored'].iloc[0])
+    assert df['HomeWinProb'].iloc[0] == pytest.approx(home_win_prob, rel=1e-12)
+    assert df['DrawProb'].iloc[0] == pytest.approx(draw_prob, rel=1e-12)
+
+
+# Last-N results of a team as a string ('W', 'D', 'L'), oldest first, from the form series
+def _form_string(df, team, n_matches=5):
+    team_matches = calculate_form_series(df, n_matches)
+    results = team_matches.loc[team_matches['Team'] == team, 'Points'].map({3: 'W', 1: 'D', 0: 'L'})
+    return ''.join(results.tail(n_matches))
+
+
+@pytest.fixture
+def team_a_matches():
+    # Seven matches of team A in date order, with dd/mm/yy dates mixed with dd/mm/yyyy dates
+    fixtures = [
+        ('08/08/98', 'A', 'B', 0, 1), ('15/08/1998', 'C', 'A', 2, 2), ('22/08/98', 'A', 'D', 3, 0),
+        ('29/08/1998', 'E', 'A', 1, 0), ('05/09/98', 'A', 'B', 2, 2), ('12/09/1998', 'A', 'C', 1, 0),
+        ('03/01/99', 'D', 'A', 0, 4),
+    ]
+    df = pd.DataFrame(fixtures, columns=['Date', 'HomeTeam', 'AwayTeam', 'FTHG', 'FTAG'])
+    df[['HomePoints', 'AwayPoints']] = df.apply(calculate_points, axis=1)
+    return df
+
+
+def test_form_with_mixed_date_formats(team_a_matches):
+    assert parse_match_dates(team_a_matches['Date']).dt.year.tolist() == [1998] * 6 + [1999]
+    assert _form_string(team_a_matches, 'A') == 'WLDWW'
+    form = calculate_form(team_a_matches).set_index('Team')['Form']
+    assert form['A'] == 3 + 0 + 1 + 3 + 3
+
+
+def test_form_of_rows_out_of_date_order(team_a_matches):
+    shuffled = team_a_matches.iloc[[6, 2, 0, 5, 3, 1, 4]].reset_index(drop=True)
+    assert _form_string(shuffled, 'A') == 'WLDWW'
+    pd.testing.assert_frame_equal(
+        calculate_form(shuffled).sort_values('Team', ignore_index=True),
+        calculate_form(team_a_matches).sort_values('Team', ignore_index=True)
+    )
@@ -1,7 +1,7 @@
 import pandas as pd
 import numpy as np
-from scipy.stats import poisson
-from predict import calculate_match_outcome_probabilities
+from probability import poisson_cdf
+from predict import calculate_match_outcome_probabilities, calculate_match_outcome_probabilities_batch
 
 
 def calculate_points(row):
@@ -25,7 +25,9 @@ def calculate_points(row):
 
 # Function to calculate xG for shots and corners
 def calculate_xg(df, average_xg_per_shot=0.11, average_xg_per_corner=0.02):
-    df.fillna(0, inplace=True)
+    # Missing shots and corners count as zero; other columns (odds, dates) keep their missing values
+    xg_columns = ['HS', 'AS', 'HC', 'AC']
+    df[xg_columns] = df[xg_columns].fillna(0)
 
     # Calculate xG for shots and corners
     df['Home_xG_scored'] = df['HS'] * average_xg_per_shot + df['HC'] * average_xg_per_corner
@@ -46,8 +48,8 @@ def calculate_expected_points_poisson(home_xg, away_xg):
 
 # Function to calculate expected points based on xG (scored and conceded)
 def calculate_expected_points_xg(home_xg_scored, away_xg_scored, home_xg_conceded, away_xg_conceded):
-    home_win_prob = poisson.cdf(home_xg_scored - 1, home_xg_conceded)
-    away_win_prob = poisson.cdf(away_xg_scored - 1, away_xg_conceded)
+    home_win_prob = poisson_cdf(home_xg_scored - 1, home_xg_conceded)
+    away_win_prob = poisson_cdf(away_xg_scored - 1, away_xg_conceded)
     draw_prob = 1 - home_win_prob - away_win_prob
 
     home_xp = (3 * home_win_prob) + (1 * draw_prob) + (0 * away_win_prob)
@@ -56,40 +58,72 @@ def calculate_expected_points_xg(home_xg_scored, away_xg_scored, home_xg_concede
     return home_xp, away_xp
 
 
+# Function to calculate outcome probabilities and expected points for all matches in one pass
+def calculate_expected_points_batch(home_xg_scored, away_xg_scored, home_xg_conceded, away_xg_conceded, max_goals=6):
+    home_win_prob, draw_prob, away_win_prob, _ = calculate_match_outcome_probabilities_batch(
+        home_xg_scored, away_xg_scored, max_goals
+    )
+
+    # Expected points from probabilities
+    home_xp_prob = (3 * home_win_prob) + (1 * draw_prob)
+    away_xp_prob = (3 * away_win_prob) + (1 * draw_prob)
+
+    # Expected points from xG (scored/conceded)
+    home_xp_xg, away_xp_xg = calculate_expected_points_xg(
+        np.asarray(home_xg_scored, dtype=float), np.asarray(away_xg_scored, dtype=float),
+        np.asarray(home_xg_conceded, dtype=float), np.asarray(away_xg_conceded, dtype=float)
+    )
+
+    return {
+        'HomeWinProb': home_win_prob,
+        'DrawProb': draw_prob,
+        'AwayWinProb': away_win_prob,
+        'HomeExpectedPoints_Prob': home_xp_prob,
+        'AwayExpectedPoints_Prob': away_xp_prob,
+        'HomeExpectedPoints_xG': home_xp_xg,
+        'AwayExpectedPoints_xG': away_xp_xg,
+    }
+
+
 # Function to calculate expected points for each match
-def calculate_expected_points(df):
-    df['HomeExpectedPoints_Prob'] = 0
-    df['AwayExpectedPoints_Prob'] = 0
-    df['HomeExpectedPoints_xG'] = 0
-    df['AwayExpectedPoints_xG'] = 0
-
-    for idx, row in df.iterrows():
-        home_xg_scored = row['Home_xG_scored']
-        away_xg_scored = row['Away_xG_scored']
-        home_xg_conceded = row['Home_xG_conceded']
-        away_xg_conceded = row['Away_xG_conceded']
-
-        # Expected points from probabilities
-        home_xp_prob, away_xp_prob = calculate_expected_points_poisson(home_xg_scored, away_xg_scored)
-
-        # Expected points from xG (scored/conceded)
-        home_xp_xg, away_xp_xg = calculate_expected_points_xg(
-            home_xg_scored, away_xg_scored, home_xg_conceded, away_xg_conceded
-        )
-
-        # Assign to DataFrame
-        df.at[idx, 'HomeExpectedPoints_Prob'] = float(home_xp_prob)
-        df.at[idx, 'AwayExpectedPoints_Prob'] = float(away_xp_prob)
-        df.at[idx, 'HomeExpectedPoints_xG'] = float(home_xp_xg)
-        df.at[idx, 'AwayExpectedPoints_xG'] = float(away_xp_xg)
+def calculate_expected_points(df, max_goals=6):
+    results = calculate_expected_points_batch(
+        df['Home_xG_scored'], df['Away_xG_scored'],
+        df['Home_xG_conceded'], df['Away_xG_conceded'],
+        max_goals
+    )
+
+    # Assign to DataFrame
+    for column, values in results.items():
+        df[column] = np.asarray(values, dtype=float)
 
     return df
 
 
-# Function to aggregate team statistics and preserve both Home and Away team information
-def aggregate_team_stats(df):
+# Function to calculate the per-match derived columns (xG, points and expected points)
+def calculate_match_columns(df, average_xg_per_shot=0.11, average_xg_per_corner=0.02, max_goals=6):
+    df = calculate_xg(df, average_xg_per_shot, average_xg_per_corner)
+
+    # Calculate points for each match
+    df[['HomePoints', 'AwayPoints']] = df.apply(calculate_points, axis=1)
+
+    # Calculate outcome probabilities and expected points for all matches
+    df = calculate_expected_points(df, max_goals)
+
+    # Expected points using Poisson probabilities
+    df['Home_xP_Poisson'] = df['HomeExpectedPoints_Prob']
+    df['Away_xP_Poisson'] = df['AwayExpectedPoints_Prob']
+
+    return df
+
+
+# Function to accumulate the home and away totals of each team, the additive part of aggregate_team_stats
+def accumulate_team_totals(df):
+    # Sum goals as 64-bit integers, the ingestion layer reads them as int8
+    df = df.astype({'FTHG': 'int64', 'FTAG': 'int64'})
+
     # Aggregating home stats
-    home_stats = df.groupby('HomeTeam').agg(
+    home_stats = df.groupby('HomeTeam', observed=True).agg(
         Matches_home=('HomePoints', 'count'),
         Points_home=('HomePoints', 'sum'),
         ExpectedPoints_Prob_home=('HomeExpectedPoints_Prob', 'sum'),
@@ -101,7 +135,7 @@ def aggregate_team_stats(df):
     ).reset_index().rename(columns={'HomeTeam': 'Team'})  # Reset index and rename 'HomeTeam' to 'Team'
 
     # Aggregating away stats
-    away_stats = df.groupby('AwayTeam').agg(
+    away_stats = df.groupby('AwayTeam', observed=True).agg(
         Matches_away=('AwayPoints', 'count'),
         Points_away=('AwayPoints', 'sum'),
         ExpectedPoints_Prob_away=('AwayExpectedPoints_Prob', 'sum'),
@@ -112,8 +146,25 @@ def aggregate_team_stats(df):
         xG_Conceded_away=('Away_xG_conceded', 'sum')
     ).reset_index().rename(columns={'AwayTeam': 'Team'})  # Reset index and rename 'AwayTeam' to 'Team'
 
+    # Team names are categorical when read through the ingestion layer, team_stats keep them as plain strings
+    home_stats['Team'] = home_stats['Team'].astype(object)
+    away_stats['Team'] = away_stats['Team'].astype(object)
+
     # Merge home_stats and away_stats on 'Team'
-    team_stats = pd.merge(home_stats, away_stats, on='Team', how='outer').fillna(0)
+    return pd.merge(home_stats, away_stats, on='Team', how='outer').fillna(0)
+
+
+# Function to fold the totals of new matches into previously accumulated team totals
+def fold_team_totals(team_totals, new_team_totals):
+    team_totals = team_totals.set_index('Team')
+    new_team_totals = new_team_totals.set_index('Team')
+    folded = team_totals.add(new_team_totals, fill_value=0)
+    return folded.sort_index().reset_index()
+
+
+# Function to turn accumulated team totals into the ranked team statistics
+def finalize_team_stats(team_totals):
+    team_stats = team_totals.copy()
 
     # Combine stats into overall statistics
     team_stats['Matches'] = team_stats['Matches_home'] + team_stats['Matches_away']
@@ -142,31 +193,74 @@ def aggregate_team_stats(df):
     return team_stats
 
 
-def calculate_form(df, n_matches=5):
-    # Create a DataFrame to store form
-    form_data = pd.DataFrame()
+# Function to aggregate team statistics and preserve both Home and Away team information
+def aggregate_team_stats(df):
+    return finalize_team_stats(accumulate_team_totals(df))
 
-    # Iterate over each team to calculate their form based on the last N matches
-    teams = pd.concat([df['HomeTeam'], df['AwayTeam']]).unique()
-    for team in teams:
-        # Filter matches where the team was involved
-        team_matches = df[(df['HomeTeam'] == team) | (df['AwayTeam'] == team)].copy()
 
-        # Sort matches by date (assuming the DataFrame is not already sorted)
-        team_matches = team_matches.sort_values('Date', ascending=False)
+# Columns identifying a match, used to find the rows added since the previous run
+MATCH_KEY_COLUMNS = ['Date', 'HomeTeam', 'AwayTeam']
+
+
+# Function to select the matches of df that are not in previous_df
+# (with key_columns set to all the CSV columns, edited matches are selected too)
+def select_new_matches(df, previous_df, key_columns=MATCH_KEY_COLUMNS):
+    key_columns = list(key_columns)
+    previous_keys = previous_df[key_columns].astype(str).drop_duplicates()
+    merged = df[key_columns].astype(str).merge(previous_keys, on=key_columns, how='left', indicator=True)
+    return df[(merged['_merge'] == 'left_only').to_numpy()].copy()
+
+
+# Function to parse football-data dates, written as dd/mm/yy in older seasons and dd/mm/yyyy in newer ones
+def parse_match_dates(dates):
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+
+    parsed = pd.to_datetime(dates, format='%d/%m/%Y', errors='coerce')
+    short_year = parsed.isna() & dates.notna()
+    parsed[short_year] = pd.to_datetime(dates[short_year], format='%d/%m/%y', errors='coerce')
+    return parsed
 
-        # Take the last N matches
-        recent_matches = team_matches.head(n_matches)
 
-        # Calculate total points earned in these matches
-        points = 0
-        for _, match in recent_matches.iterrows():
-            if match['HomeTeam'] == team:
-                points += match['HomePoints']
-            elif match['AwayTeam'] == team:
-                points += match['AwayPoints']
+# Function to build a long-format team-match table with one row per team and match (two rows per fixture)
+def build_team_match_table(df):
+    dates = parse_match_dates(df['Date'])
 
-        # Append the result to form_data
-        form_data = pd.concat([form_data, pd.DataFrame({'Team': [team], 'Form': [points]})])
+    home = pd.DataFrame({
+        'MatchIndex': df.index, 'Date': dates, 'Team': df['HomeTeam'], 'Opponent': df['AwayTeam'],
+        'Venue': 'Home', 'GF': df['FTHG'], 'GA': df['FTAG'], 'Points': df['HomePoints'],
+    })
+    away = pd.DataFrame({
+        'MatchIndex': df.index, 'Date': dates, 'Team': df['AwayTeam'], 'Opponent': df['HomeTeam'],
+        'Venue': 'Away', 'GF': df['FTAG'], 'GA': df['FTHG'], 'Points': df['AwayPoints'],
+    })
 
-    return form_data.reset_index(drop=True)
\ No newline at end of file
+    # Sort once by team and date, keeping the file order for matches on the same date
+    team_matches = pd.concat([home, away], ignore_index=True)
+    team_matches = team_matches.sort_values(['Team', 'Date', 'MatchIndex'], kind='mergesort', ignore_index=True)
+    return team_matches
+
+
+# Function to calculate form as a time series: the points of each team in its last N matches,
+# before ('FormBefore') and after ('FormAfter') each match
+def calculate_form_series(df, n_matches=5):
+    team_matches = build_team_match_table(df)
+    teams = team_matches.groupby('Team', sort=False, observed=True)
+
+    # Rolling sum of the last N matches from the difference of cumulative sums within each team
+    cumulative_points = teams['Points'].cumsum()
+    team_matches['FormAfter'] = cumulative_points - cumulative_points.groupby(team_matches['Team'], sort=False, observed=True).shift(n_matches).fillna(0)
+    team_matches['FormBefore'] = team_matches.groupby('Team', sort=False, observed=True)['FormAfter'].shift(1).fillna(0)
+    team_matches[['FormAfter', 'FormBefore']] = team_matches[['FormAfter', 'FormBefore']].astype(team_matches['Points'].dtype)
+
+    return team_matches
+
+
+def calculate_form(df, n_matches=5):
+    # Form of each team after its latest match, based on the last N matches
+    form_series = calculate_form_series(df, n_matches)
+    latest_form = form_series.groupby('Team', sort=False, observed=True)['FormAfter'].last()
+
+    # Keep the team order of the fixtures (home teams first)
+    teams = pd.concat([df['HomeTeam'], df['AwayTeam']]).unique()
+    return pd.DataFrame({'Team': teams, 'Form': latest_form.reindex(teams).to_numpy()})
@@ -1,50 +1,156 @@
-import matplotlib.pyplot as plt
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
 import seaborn as sns
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# The three Actual vs Expected panels: (actual column, expected column, actual label, expected label, title, y label)
+PERFORMANCE_PANELS = [
+    ('Points', 'ExpectedPoints_xG', 'Actual Points', 'Expected Points', 'Points vs Expected Points', 'Points'),
+    ('GF', 'xG_Scored', 'Goals Scored', 'Expected Goals Scored', 'Goals Scored vs Expected Goals Scored', 'Goals Scored'),
+    ('GA', 'xG_Conceded', 'Goals Conceded', 'Expected Goals Conceded', 'Goals Conceded vs Expected Goals Conceded', 'Goals Conceded'),
+]
+
+
+def draw_team_performance(axes, team_stats):
+    # Draw the Actual vs Expected line plots of team_stats on three axes
+    for ax, (actual, expected, actual_label, expected_label, title, ylabel) in zip(axes, PERFORMANCE_PANELS):
+        ax.plot(team_stats['Team'], team_stats[actual], label=actual_label, marker='o', color='blue')
+        ax.plot(team_stats['Team'], team_stats[expected], label=expected_label, marker='x', color='orange')
+        ax.set_title(title)
+        ax.set_xlabel('Team')
+        ax.set_ylabel(ylabel)
+        ax.tick_params(axis='x', rotation=90)  # Rotate team names for readability
+        ax.legend()
+
 
 def visualize_team_performance(team_stats):
     """
     Visualize the relationships between Actual vs Expected performance metrics for teams.
     Creates line plots for Points/Expected Points, Goals Scored/Expected Goals Scored, and
     Goals Conceded/Expected Goals Conceded with reference lines.
-    
+
     Parameters:
     - team_stats (DataFrame): The team statistics DataFrame containing the relevant columns.
     """
+    # pyplot picks an interactive backend, so it is only imported to show the chart window
+    import matplotlib.pyplot as plt
+
     # Set up the seaborn style
     sns.set(style="whitegrid")
 
     # Create a figure with subplots
     fig, axes = plt.subplots(1, 3, figsize=(18, 6))
-
-    # 1. Points vs Expected Points
-    axes[0].plot(team_stats['Team'], team_stats['Points'], label='Actual Points', marker='o', color='blue')
-    axes[0].plot(team_stats['Team'], team_stats['ExpectedPoints_xG'], label='Expected Points', marker='x', color='orange')
-    axes[0].set_title('Points vs Expected Points')
-    axes[0].set_xlabel('Team')
-    axes[0].set_ylabel('Points')
-    axes[0].tick_params(axis='x', rotation=90)  # Rotate team names for readability
-    axes[0].legend()
-
-    # 2. Goals Scored vs Expected Goals Scored
-    axes[1].plot(team_stats['Team'], team_stats['GF'], label='Goals Scored', marker='o', color='blue')
-    axes[1].plot(team_stats['Team'], team_stats['xG_Scored'], label='Expected Goals Scored', marker='x', color='orange')
-    axes[1].set_title('Goals Scored vs Expected Goals Scored')
-    axes[1].set_xlabel('Team')
-    axes[1].set_ylabel('Goals Scored')
-    axes[1].tick_params(axis='x', rotation=90)  # Rotate team names for readability
-    axes[1].legend()
-
-    # 3. Goals Conceded vs Expected Goals Conceded
-    axes[2].plot(team_stats['Team'], team_stats['GA'], label='Goals Conceded', marker='o', color='blue')
-    axes[2].plot(team_stats['Team'], team_stats['xG_Conceded'], label='Expected Goals Conceded', marker='x', color='orange')
-    axes[2].set_title('Goals Conceded vs Expected Goals Conceded')
-    axes[2].set_xlabel('Team')
-    axes[2].set_ylabel('Goals Conceded')
-    axes[2].tick_params(axis='x', rotation=90)  # Rotate team names for readability
-    axes[2].legend()
+    draw_team_performance(axes, team_stats)
 
     # Adjust layout to make sure labels and titles fit
     plt.tight_layout()
 
     # Show the plot
     plt.show()
+
+
+class TeamPerformanceRenderer:
+    """
+    Headless renderer of the team performance chart on the Agg backend.
+
+    One figure and its three axes are created once and cleared between charts, so
+    rendering many leagues does not rebuild the figure every time. The file format
+    (e.g. PNG or SVG) follows the extension of the output path.
+    """
+
+    def __init__(self, figsize=(18, 6), dpi=100):
+        with sns.axes_style('whitegrid'):
+            self.figure = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(self.figure)
+            self.axes = self.figure.subplots(1, 3)
+
+    def render(self, team_stats, path, title=None):
+        with sns.axes_style('whitegrid'):
+            for ax in self.axes:
+                ax.clear()
+            draw_team_performance(self.axes, team_stats)
+            self.figure.suptitle(title or '')
+            self.figure.tight_layout()
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.figure.savefig(path)
+        return path
+
+
+# Renderer of the current process, created on first use so worker processes each build their own
+_renderer = None
+
+
+def render_team_performance(team_stats, path, title=None):
+    # Render one chart to a file with the renderer of the current process.
+    # team_stats is a DataFrame or the path of a saved team stats Parquet file.
+    global _renderer
+    if _renderer is None:
+        _renderer = TeamPerformanceRenderer()
+    if isinstance(team_stats, str):
+        team_stats = pd.read_parquet(team_stats)
+    return _renderer.render(team_stats, path, title)
+
+
+def _render_chart(chart):
+    return render_team_performance(*chart)
+
+
+def _render_chart_or_error(chart):
+    # (path, None) for a rendered chart, (None, error message) for a failed one
+    try:
+        return _render_chart(chart), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def render_many(charts, workers=1, return_errors=False):
+    """
+    Render many team performance charts, optionally across worker processes.
+
+    Parameters:
+    - charts (list): (team_stats, path, title) tuples, where team_stats is a DataFrame or
+      the path of a saved team stats Parquet file.
+    - workers (int): Number of worker processes, charts are rendered in this process if 1.
+    - return_errors (bool): Return a (path, error) pair per chart instead of raising on the
+      first chart that fails, so one bad chart does not stop a batch.
+
+    Returns:
+    - paths (list): The paths of the rendered charts, or (path, error) pairs with return_errors.
+    """
+    charts = list(charts)
+    render = _render_chart_or_error if return_errors else _render_chart
+    if workers > 1 and len(charts) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(render, charts, chunksize=max(1, len(charts) // (workers * 4))))
+    return [render(chart) for chart in charts]
+
+
+# Build the path of the chart of one league and season, e.g. 'charts/2425/I1.png'
+def chart_path(chart_folder, season_year, league, chart_format='png'):
+    return os.path.join(chart_folder, season_year, f"{league}.{chart_format}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render the team performance charts of saved team stats.")
+    parser.add_argument('--season', type=str, required=True, help="The season of the saved team stats (e.g., '2425').")
+    parser.add_argument('--files', type=str, required=True, help="League files to render (e.g., 'I1,I2,E0').")
+    parser.add_argument('--folder', type=str, default='charts', help="Output folder of the charts.")
+    parser.add_argument('--format', type=str, default='png', help="Chart file format (e.g., 'png' or 'svg').")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes.")
+    args = parser.parse_args()
+
+    processed_folder = os.path.join(f"{args.season[:2]}_{args.season[2:]}_parquet", 'processed_data')
+    leagues = [league.strip() for league in args.files.split(',') if league.strip()]
+    paths = render_many([
+        (os.path.join(processed_folder, f"{league}.parquet"), chart_path(args.folder, args.season, league, args.format),
+         f"{league} {args.season}")
+        for league in leagues
+    ], args.workers)
+    for path in paths:
+        print(f"Chart saved to {path}")